@@ -16,48 +16,10 @@ if sys.platform == "darwin":
 elif sys.platform == "win32":
     import win32gui
 from pynput import keyboard
+from pyterm.parser import symb, parse
 
 CLOSED = False
 
-symb = {
-    "\t": "tab",
-    "\n": "return",
-    "\r": "backspace",
-    " ": "space",
-    "`": "backtick",
-    "~": "tilde",
-    "!": "exclamation",
-    "@": "at sign",
-    "#": "hashtag",
-    "$": "dollar sign",
-    "%": "percent sign",
-    "^": "exponent",
-    "&": "and",
-    "*": "asterisk",
-    "(": "open round bracket",
-    ")": "close round bracket",
-    "-": "minus",
-    "_": "underscore",
-    "=": "equals",
-    "+": "plus",
-    "[": "open square bracket",
-    "]": "close square bracket",
-    "{": "open brace",
-    "}": "close brace",
-    "\\": "backslash",
-    "/": "slash",
-    "|": "vertical pipe",
-    ";": "semicolon",
-    ":": "colon",
-    "'": "single quote",
-    '"': "double quotes",
-    ",": "comma",
-    ".": "dot",
-    "<": "left angle bracket",
-    ">": "right angle bracket",
-    "?": "question mark"
-}
-
 
 def get_key_name(key):
     try:
@@ -157,26 +119,6 @@ def close():
     CLOSED = True
 
 
-def to_name(button):
-    match button:
-        case 0:
-            return "LeftMouseDown"
-        case 3:
-            return "LeftMouseUp"
-        case 35:
-            return "MouseMove"
-        case 64:
-            return "ScrollDown"
-        case 65:
-            return "ScrollUp"
-        case 67:
-            return "ScrollRight"
-        case 66:
-            return "ScrollLeft"
-        case 32:
-            return "MouseMove"
-
-
 def start(closed):
     try:
         # with keyboard.Listener(
@@ -192,49 +134,15 @@ def start(closed):
             while not closed():
                 # time.sleep(0.01)
                 if select.select([sys.stdin, ], [], [], .1)[0]:
-                    data = sys.stdin.buffer.read(1)
-                    if data == b"\033":
-                        seq = sys.stdin.buffer.read(2)
-                        if seq == b"[M":
-                            # event = data[3:]
-                            # if len(event) >= 3:
-                            event = sys.stdin.buffer.read(3)
-                            button = event[0] - 32
-                            col = event[2] - 32 - 1
-                            row = event[1] - 32 - 1
-                            if {"values": (to_name(button), (row, col*2)), "type": "MOUSE"} not in events:
-                                events.append({"values": (to_name(button), (row, col*2)), "type": "MOUSE"})
-                        else:
-                            decoded = None
-                            if seq == b"[A":
-                                decoded = "KEY_UP"
-                            elif seq == b"[B":
-                                decoded = "KEY_DOWN"
-                            elif seq == b"[C":
-                                decoded = "KEY_RIGHT"
-                            elif seq == b"[D":
-                                decoded = "KEY_LEFT"
-                            elif seq == b"x7f":
-                                decoded = "KEY_BACKSPACE"
-                            if decoded:
-                                events.append({"values": (decoded, "KEYDOWN"), "type": "KEY"})
-                                pressed[decoded] = True
+                    event = parse(sys.stdin.buffer.read)
+                    if event is None:
+                        continue
+                    if event["type"] == "MOUSE":
+                        if event not in events:
+                            events.append(event)
                     else:
-                        if event == b'/x1b':
-                            decoded = "KEY_ESCAPE"
-                            events.append({"values": (decoded, "KEYDOWN"), "type": "KEY"})
-                            pressed[decoded] = True
-                        elif decoded := data.decode("utf-8"):
-                            if decoded in symb:
-                                decoded = symb[decoded].upper()
-                            decoded = "KEY_" + decoded
-                            events.append({"values": (decoded, "KEYDOWN"), "type": "KEY"})
-                            pressed[decoded] = True
-                        # print(f"Mouse: {to_name(button)}, ({row}, {col})")
-                    # data = sys.stdin.buffer.read(6)
-                    # if data.startswith(b"\033[M"):
-                    # else:
-                    #     events.append({"values": ("KEY_" + data.decode("utf-8"), "KEYDOWN"), "type": "KEY"})
+                        events.append(event)
+                        pressed[event["values"][0]] = True
 
             disable_mouse_tracking()
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
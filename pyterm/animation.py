@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Iterator
+from pyterm.image import Image
+from PIL import Image as PImage
+import os
+
+DEFAULT_DURATION = 0.1
+
+
+class Animation:
+    def __init__(self, filename: os.PathLike | str | PImage.Image, window: int = 8):
+        # Frames are decoded on demand; at most window of them are kept.
+        self.__path: os.PathLike | str | None = None if isinstance(filename, PImage.Image) else filename
+        self.__file: PImage.Image = filename if self.__path is None else PImage.open(filename)
+        self.__count: int = getattr(self.__file, "n_frames", 1)
+        self.__window: int = max(1, window)
+        self.__frames: OrderedDict[int, Image] = OrderedDict()
+        self.__durations: dict[int, float] = {}
+        self.__decoded: int = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__file.size
+
+    @property
+    def width(self) -> int:
+        return self.__file.width
+
+    @property
+    def height(self) -> int:
+        return self.__file.height
+
+    @property
+    def loop(self) -> int | None:
+        # 0 loops forever, None plays once, as stored in the file.
+        return self.__file.info.get("loop")
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def decoded(self) -> int:
+        return self.__decoded
+
+    def __seek(self, index: int) -> None:
+        # Formats decode frames in order, so going back means starting over;
+        # reopening avoids Pillow's APNG rewind failing after a loaded frame.
+        if index < self.__file.tell() and self.__path is not None:
+            self.__file.close()
+            self.__file = PImage.open(self.__path)
+        self.__file.seek(index)
+        duration = self.__file.info.get("duration")
+        self.__durations[index] = duration / 1000 if duration else DEFAULT_DURATION
+
+    def __getitem__(self, index: int) -> Image:
+        if index < 0:
+            index += self.__count
+        if not 0 <= index < self.__count:
+            raise IndexError(f"Frame {index} out of range for {self.__count} frames")
+        image = self.__frames.get(index)
+        if image is not None:
+            self.__frames.move_to_end(index)
+            return image
+        self.__seek(index)
+        image = self.__frames[index] = Image.fromPIL(self.__file)
+        self.__decoded += 1
+        while len(self.__frames) > self.__window:
+            self.__frames.popitem(last=False)
+        return image
+
+    def duration(self, index: int) -> float:
+        # Seconds the frame stays on screen; only seeks, the frame isn't converted.
+        if index < 0:
+            index += self.__count
+        if index not in self.__durations:
+            self.__seek(index)
+        return self.__durations[index]
+
+    @property
+    def total_duration(self) -> float:
+        return sum(self.duration(i) for i in range(self.__count))
+
+    def frames(self, loop: bool = False) -> Iterator[tuple[Image, float]]:
+        # Yields (image, seconds) in order; each frame is decoded only when it is
+        # reached, unless it is still in the window.
+        while True:
+            for i in range(self.__count):
+                image = self[i]
+                yield image, self.__durations[i]
+            if not loop:
+                return
+
+    def __iter__(self) -> Iterator[Image]:
+        return (image for image, _ in self.frames())
+
+    def close(self) -> None:
+        self.__frames.clear()
+        if self.__path is not None:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
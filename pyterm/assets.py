@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from pyterm.image import Image, RAW_EXTENSION
+import argparse
+import os
+import sys
+
+SOURCE_EXTENSIONS = (".png", ".gif", ".bmp", ".jpg", ".jpeg", ".tga", ".webp")
+
+
+def cost(image: Image) -> int:
+    # Four bytes of packed color and one of alpha per pixel.
+    return 5 * image.width * image.height
+
+
+class AssetCache:
+    def __init__(self, budget: int = 64 << 20):
+        # The budget is in bytes of decoded pixel storage.
+        self.__budget = budget
+        self.__used = 0
+        self.__entries: OrderedDict[str, tuple[tuple[int, int], Image]] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @staticmethod
+    def __key(path: os.PathLike | str) -> tuple[str, tuple[int, int]]:
+        # A file rewritten in place gets a new mtime or size and is decoded again.
+        path = os.path.abspath(os.fspath(path))
+        stat = os.stat(path)
+        return path, (stat.st_mtime_ns, stat.st_size)
+
+    def __load(self, path: os.PathLike | str, count: bool) -> Image:
+        path, stamp = self.__key(path)
+        entry = self.__entries.get(path)
+        if entry is not None and entry[0] == stamp:
+            self.__entries.move_to_end(path)
+            if count:
+                self.__hits += 1
+            return entry[1]
+        if count:
+            self.__misses += 1
+        if entry is not None:
+            self.__drop(path)
+        image = Image.open(path, cache=False)
+        self.__entries[path] = (stamp, image)
+        self.__used += cost(image)
+        self.__trim()
+        return image
+
+    def __drop(self, path: str) -> None:
+        _, image = self.__entries.pop(path)
+        self.__used -= cost(image)
+
+    def __trim(self) -> None:
+        while self.__used > self.__budget and len(self.__entries) > 1:
+            self.__drop(next(iter(self.__entries)))
+
+    def open(self, path: os.PathLike | str) -> Image:
+        # Callers get copy-on-write views, the cached Image itself is never handed out.
+        return self.__load(path, True).share()
+
+    def preload(self, *paths: os.PathLike | str) -> None:
+        for path in paths:
+            self.__load(path, False)
+
+    def evict(self, *paths: os.PathLike | str) -> None:
+        # Without arguments everything is evicted.
+        if not paths:
+            self.clear()
+            return
+        for path in paths:
+            path = os.path.abspath(os.fspath(path))
+            if path in self.__entries:
+                self.__drop(path)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__used = 0
+
+    def __contains__(self, path: os.PathLike | str) -> bool:
+        return os.path.abspath(os.fspath(path)) in self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def budget(self) -> int:
+        return self.__budget
+
+    @budget.setter
+    def budget(self, value: int) -> None:
+        self.__budget = value
+        self.__trim()
+
+    @property
+    def used(self) -> int:
+        return self.__used
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.__hits + self.__misses
+        return self.__hits / total if total else 0.0
+
+    def reset_stats(self) -> None:
+        self.__hits = self.__misses = 0
+
+
+def convert(source: os.PathLike | str, target: os.PathLike | str, force: bool = False) -> list[str]:
+    # Mirrors every decodable image under source as a raw image under target,
+    # skipping files whose raw copy is already newer. Returns the written paths.
+    written = []
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in SOURCE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            out = os.path.normpath(os.path.join(target, os.path.relpath(root, source), stem + RAW_EXTENSION))
+            if not force and os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(path):
+                continue
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            Image.open(path, cache=False).save_raw(out)
+            written.append(out)
+    return written
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pyterm.assets", description="convert images to pyterm raw images")
+    parser.add_argument("source", help="directory of images to convert")
+    parser.add_argument("target", help="directory to write the raw images to")
+    parser.add_argument("-f", "--force", action="store_true", help="convert even if the raw image is up to date")
+    args = parser.parse_args(argv)
+    for path in convert(args.source, args.target, args.force):
+        print(path)
+    return 0
+
+
+cache = AssetCache()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+from pyterm.framebuffer import FrameBuffer, as_area
+from pyterm.image import Image
+from pyterm.rect import Rect
+import json
+import os
+
+
+class Skyline:
+    def __init__(self, size: tuple[int, int] | list[int, int], segments: list[list[int]] | None = None):
+        self.__width: int = size[0]
+        self.__height: int = size[1]
+        # Segments of the skyline as [x, y, width], left to right.
+        self.__skyline: list[list[int]] = [list(s) for s in segments] if segments else [[0, 0, self.__width]]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__width, self.__height
+
+    @property
+    def segments(self) -> list[list[int]]:
+        return [list(segment) for segment in self.__skyline]
+
+    def __fit(self, index: int, width: int, height: int) -> int | None:
+        x = self.__skyline[index][0]
+        if x + width > self.__width:
+            return None
+        y, remaining = 0, width
+        while remaining > 0:
+            segment = self.__skyline[index]
+            y = max(y, segment[1])
+            if y + height > self.__height:
+                return None
+            remaining -= segment[2]
+            index += 1
+        return y
+
+    def insert(self, width: int, height: int) -> tuple[int, int] | None:
+        # Bottom-left rule: the lowest top edge wins, then the narrowest segment.
+        best, best_key = None, None
+        for i, segment in enumerate(self.__skyline):
+            y = self.__fit(i, width, height)
+            if y is not None and (best_key is None or (y + height, segment[2]) < best_key):
+                best, best_key = (i, segment[0], y), (y + height, segment[2])
+        if best is None:
+            return None
+        i, x, y = best
+        self.__skyline.insert(i, [x, y + height, width])
+        right = x + width
+        j = i + 1
+        while j < len(self.__skyline) and self.__skyline[j][0] < right:
+            segment = self.__skyline[j]
+            shrink = right - segment[0]
+            if shrink < segment[2]:
+                segment[0], segment[2] = right, segment[2] - shrink
+                break
+            del self.__skyline[j]
+        j = 0
+        while j < len(self.__skyline) - 1:
+            if self.__skyline[j][1] == self.__skyline[j + 1][1]:
+                self.__skyline[j][2] += self.__skyline.pop(j + 1)[2]
+            else:
+                j += 1
+        return x, y
+
+
+class Region:
+    # A view of part of an atlas image. Blitting a region reads straight from
+    # the atlas, nothing is copied.
+    __slots__ = ("__image", "__rect")
+
+    def __init__(self, image: Image, rect: Rect):
+        self.__image: Image = image
+        self.__rect: Rect = rect
+
+    @property
+    def image(self) -> Image:
+        return self.__image
+
+    @property
+    def rect(self) -> Rect:
+        return self.__rect
+
+    @property
+    def width(self) -> int:
+        return self.__rect.width
+
+    @property
+    def height(self) -> int:
+        return self.__rect.height
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__rect.width, self.__rect.height
+
+    def source(self, dest: tuple[int, int] | list[int, int],
+               area: Rect | tuple[int, int, int, int] | None) -> tuple[FrameBuffer, tuple[int, int], tuple]:
+        ax, ay, aw, ah = as_area(area) if area is not None else (0, 0, self.width, self.height)
+        x0, y0 = max(0, ax), max(0, ay)
+        x1, y1 = min(self.width, ax + aw), min(self.height, ay + ah)
+        return (
+            self.__image.source(dest, None)[0],
+            (dest[0] + x0 - ax, dest[1] + y0 - ay),
+            (self.__rect.x + x0, self.__rect.y + y0, max(0, x1 - x0), max(0, y1 - y0))
+        )
+
+    def get_pixel(self, pos: tuple[int, int] | list[int, int]) -> tuple[int, int, int] | None:
+        if not (0 <= pos[0] < self.width and 0 <= pos[1] < self.height):
+            return None
+        return self.__image.get_pixel((self.__rect.x + pos[0], self.__rect.y + pos[1]))
+
+    def to_image(self) -> Image:
+        return self.__image.cropped(self.__rect)
+
+    def to_rect(self, **keys) -> Rect:
+        return Image.to_rect(self, **keys)
+
+
+class Atlas:
+    def __init__(self, size: tuple[int, int] | list[int, int] = (512, 512), padding: int = 0):
+        self.__image: Image = Image(size)
+        self.__packer: Skyline = Skyline(size)
+        self.__padding: int = padding
+        self.__regions: dict[str, Region] = {}
+
+    @staticmethod
+    def build(images: dict[str, Image], width: int = 512, padding: int = 0):
+        # Tallest first packs tightest; add() grows the height as needed.
+        order = sorted(images, key=lambda name: (images[name].height, images[name].width), reverse=True)
+        atlas = Atlas((width, 16), padding)
+        for name in order:
+            atlas.add(name, images[name])
+        atlas.__trim()
+        return atlas
+
+    def __resize(self, height: int) -> None:
+        # Regions handed out earlier keep reading the old image, which stays valid.
+        self.__image = self.__image.cropped(Rect(0, 0, self.__image.width, height))
+        self.__packer = Skyline(self.__image.size, self.__packer.segments)
+        self.__regions = {name: Region(self.__image, region.rect) for name, region in self.__regions.items()}
+
+    def __trim(self) -> None:
+        # Drops the unused rows below the tallest column of the skyline.
+        height = max((segment[1] for segment in self.__packer.segments), default=0)
+        if height < self.__image.height:
+            self.__resize(height)
+
+    @property
+    def image(self) -> Image:
+        return self.__image
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__image.size
+
+    @property
+    def regions(self) -> dict[str, Region]:
+        return dict(self.__regions)
+
+    def add(self, name: str, image: Image) -> Region:
+        if name in self.__regions:
+            raise KeyError(f"Duplicate atlas entry: {name}")
+        width, height = image.width + self.__padding, image.height + self.__padding
+        if width > self.__image.width:
+            raise ValueError(f"Too wide for the atlas: {name} ({image.width}x{image.height})")
+        pos = self.__packer.insert(width, height)
+        while pos is None:
+            # Full, so the height doubles; packed pixels and regions stay put.
+            self.__resize(max(2 * self.__image.height, 16))
+            pos = self.__packer.insert(width, height)
+        self.__image.blit(image, pos)
+        region = self.__regions[name] = Region(self.__image, Rect(pos[0], pos[1], image.width, image.height))
+        return region
+
+    def __getitem__(self, name: str) -> Region:
+        return self.__regions[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__regions
+
+    def __iter__(self):
+        return iter(self.__regions)
+
+    def __len__(self) -> int:
+        return len(self.__regions)
+
+    def save(self, path: os.PathLike | str) -> None:
+        # The pixels go to path as a PNG and the index next to it as JSON.
+        self.__image.toPIL().save(path, format="PNG")
+        index = {
+            "size": list(self.size),
+            "padding": self.__padding,
+            "skyline": self.__packer.segments,
+            "regions": {name: list(region.rect.to_tuple()) for name, region in self.__regions.items()}
+        }
+        with open(f"{path}.json", "w") as file:
+            json.dump(index, file)
+
+    @staticmethod
+    def load(path: os.PathLike | str):
+        with open(f"{path}.json") as file:
+            index = json.load(file)
+        atlas = Atlas(index["size"], index["padding"])
+        atlas.__image = Image.open(path)
+        atlas.__packer = Skyline(index["size"], index["skyline"])
+        atlas.__regions = {name: Region(atlas.__image, Rect(*rect)) for name, rect in index["regions"].items()}
+        return atlas
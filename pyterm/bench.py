@@ -0,0 +1,433 @@
+from typing import Callable
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import pyterm.keys as keys
+import pyterm.draw as draw
+import pyterm.transform as transform
+from pyterm.display import Display
+from pyterm.image import Image
+from pyterm.rect import Rect
+from pyterm.parser import parse
+
+SCENARIOS: dict[str, Callable[[], tuple[Callable[[], object], dict]]] = {}
+TERMINAL_SIZE = (120, 40)
+# Scratch files for the scenarios of one run, removed by run_all.
+TEMP_DIR: tempfile.TemporaryDirectory | None = None
+
+
+def scenario(name: str):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+def display(**kwargs) -> Display:
+    return Display((0, 0), keys.FULLSCREEN, headless=True, terminal_size=TERMINAL_SIZE, capture=False, **kwargs)
+
+
+def temp_path(name: str) -> str:
+    global TEMP_DIR
+    if TEMP_DIR is None:
+        TEMP_DIR = tempfile.TemporaryDirectory(prefix="pyterm-bench-")
+    return os.path.join(TEMP_DIR.name, name)
+
+
+def sprite(size: int, transparent: bool = False) -> Image:
+    image = Image((size, size))
+    rng = random.Random(size)
+    for x in range(size):
+        for y in range(size):
+            if not transparent or (x - size // 2) ** 2 + (y - size // 2) ** 2 <= (size // 2) ** 2:
+                image.put_pixel((x, y), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return image
+
+
+def noise(size: tuple[int, int], seed: int) -> Image:
+    image = Image(size)
+    rng = random.Random(seed)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            image.put_pixel((x, y), (rng.randrange(0, 256, 32), rng.randrange(0, 256, 32), 96))
+    return image
+
+
+@scenario("display.fill")
+def bench_fill():
+    d = display()
+    return lambda: d.fill((10, 20, 30)), {}
+
+
+for _size in (8, 32, 128):
+    for _transparent in (False, True):
+        def bench_blit(size=_size, transparent=_transparent):
+            target = Image((160, 160))
+            image = sprite(size, transparent)
+            return lambda: target.blit(image, (5, 3)), {}
+        scenario(f"image.blit.{_size}{'.alpha' if _transparent else ''}")(bench_blit)
+
+
+@scenario("display.blit.scroll")
+def bench_scroll():
+    d = display()
+    world = noise((1024, 512), 5)
+    state = {"frame": 0}
+
+    def run():
+        i = state["frame"] = state["frame"] + 1
+        d.blit(world, (-(i % 900), -(i % 400)))
+    return run, {}
+
+
+@scenario("display.blit.area")
+def bench_area():
+    d = display()
+    sheet = sprite(128)
+    frames = [Rect(x, y, 16, 16) for x in range(0, 128, 16) for y in range(0, 128, 16)]
+    state = {"frame": 0}
+
+    def run():
+        i = state["frame"] = state["frame"] + 1
+        d.blit(sheet, (i % d.width, 10), frames[i % len(frames)])
+    return run, {}
+
+
+def translucent(size: tuple[int, int], seed: int) -> Image:
+    image = Image(size)
+    rng = random.Random(seed)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            image.put_pixel((x, y), (200, 200, 210, rng.randrange(256)))
+    return image
+
+
+for _mode in (keys.BLEND_OVER, keys.BLEND_ADD, keys.BLEND_MULTIPLY):
+    def bench_blend(mode=_mode):
+        d = display()
+        smoke = translucent((d.width + 1, d.height + 1), 7)
+        d.blit(noise(smoke.size, 3), (0, 0))
+        return lambda: d.blit(smoke, (0, 0), blend=mode), {}
+    scenario(f"display.blit.blend.{_mode}")(bench_blend)
+
+
+@scenario("draw.rect")
+def bench_rect():
+    image = Image((128, 128))
+    return lambda: draw.rect(image, (255, 0, 0), (10, 10, 100, 60)), {}
+
+
+@scenario("draw.rect.outline")
+def bench_rect_outline():
+    image = Image((128, 128))
+    return lambda: draw.rect(image, (255, 0, 0), (10, 10, 100, 60), 2), {}
+
+
+@scenario("draw.circle")
+def bench_circle():
+    image = Image((128, 128))
+    return lambda: draw.circle(image, (0, 255, 0), (64, 64), 40), {}
+
+
+@scenario("draw.circle.outline")
+def bench_circle_outline():
+    image = Image((128, 128))
+    return lambda: draw.circle(image, (0, 255, 0), (64, 64), 40, 2), {}
+
+
+@scenario("draw.ellipse")
+def bench_ellipse():
+    image = Image((128, 128))
+    return lambda: draw.ellipse(image, (0, 255, 0), (10, 20, 100, 70)), {}
+
+
+@scenario("draw.arc")
+def bench_arc():
+    image = Image((128, 128))
+    return lambda: draw.arc(image, (0, 255, 0), (10, 20, 100, 70), 0.5, 4.0, 3), {}
+
+
+@scenario("draw.pie")
+def bench_pie():
+    image = Image((128, 128))
+    return lambda: draw.pie(image, (0, 255, 0), (10, 20, 100, 70), 0.5, 4.0), {}
+
+
+@scenario("draw.line")
+def bench_line():
+    image = Image((128, 128))
+    return lambda: draw.line(image, (0, 0, 255), (3, 5), (120, 90)), {}
+
+
+@scenario("draw.line.thick")
+def bench_line_thick():
+    image = Image((128, 128))
+    return lambda: draw.line(image, (0, 0, 255), (3, 5), (120, 90), 4), {}
+
+
+@scenario("draw.line.aa")
+def bench_line_aa():
+    image = Image((128, 128))
+    return lambda: draw.line(image, (0, 0, 255), (3, 5), (120, 90), antialias=True), {}
+
+
+@scenario("draw.lines")
+def bench_lines():
+    image = Image((128, 128))
+    rng = random.Random(0)
+    points = [(x, rng.randrange(128)) for x in range(0, 128, 4)]
+    return lambda: draw.lines(image, (0, 255, 255), False, points), {}
+
+
+@scenario("draw.polygon")
+def bench_polygon():
+    image = Image((128, 128))
+    points = [(10, 10), (110, 20), (90, 100), (50, 70), (20, 110)]
+    return lambda: draw.polygon(image, (255, 255, 0), points), {}
+
+
+@scenario("draw.polygon.nonzero")
+def bench_polygon_nonzero():
+    image = Image((128, 128))
+    points = [(64, 4), (100, 120), (4, 44), (124, 44), (28, 120)]
+    return lambda: draw.polygon(image, (255, 255, 0), points, rule=keys.NONZERO), {}
+
+
+@scenario("draw.polygons")
+def bench_polygons():
+    image = Image((128, 128))
+    rng = random.Random(0)
+    shapes = []
+    for _ in range(200):
+        x, y = rng.randrange(120), rng.randrange(120)
+        shapes.append([(x + rng.randrange(8), y + rng.randrange(8)) for _ in range(rng.randrange(3, 7))])
+    return lambda: draw.polygons(image, (200, 200, 200), shapes), {"per_call": len(shapes)}
+
+
+@scenario("transform.scale")
+def bench_scale():
+    image = sprite(32)
+    return lambda: transform.scale(image, (48, 40)), {}
+
+
+@scenario("transform.scale2x")
+def bench_scale2x():
+    image = sprite(32)
+    return lambda: transform.scale2x(image), {}
+
+
+@scenario("transform.scale_by")
+def bench_scale_by():
+    image = sprite(32)
+    return lambda: transform.scale_by(image, (0.5, 1.5)), {}
+
+
+@scenario("transform.flip")
+def bench_flip():
+    image = sprite(32)
+    return lambda: transform.flip(image, True, True), {}
+
+
+@scenario("transform.rotate")
+def bench_rotate():
+    image = sprite(32)
+    return lambda: transform.rotate(image, 30), {}
+
+
+def pil_sprite(size: int):
+    from PIL import Image as PImage
+    rng = random.Random(size)
+    pil = PImage.new("RGBA", (size, size))
+    pil.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice((0, 255)))
+                 for _ in range(size * size)])
+    return pil
+
+
+for _size in (16, 64, 256, 512):
+    def bench_open(size=_size):
+        path = temp_path(f"sprite{size}.png")
+        pil_sprite(size).save(path)
+        return lambda: Image.open(path, cache=False), {}
+
+    def bench_open_cached(size=_size):
+        path = temp_path(f"sprite{size}.png")
+        pil_sprite(size).save(path)
+        return lambda: Image.open(path), {}
+
+    def bench_from_pil(size=_size):
+        pil = pil_sprite(size)
+        return lambda: Image.fromPIL(pil), {}
+
+    def bench_decode(size=_size):
+        # PIL alone, the floor for image.open.
+        from PIL import Image as PImage
+        path = temp_path(f"sprite{size}.png")
+        pil_sprite(size).save(path)
+
+        def run():
+            with PImage.open(path) as image:
+                return image.convert("RGBA").tobytes()
+        return run, {}
+    scenario(f"image.open.{_size}")(bench_open)
+    scenario(f"image.open.cached.{_size}")(bench_open_cached)
+    scenario(f"image.fromPIL.{_size}")(bench_from_pil)
+    scenario(f"pil.decode.{_size}")(bench_decode)
+
+
+def bench_update(kind: str, **kwargs):
+    d = display(**kwargs)
+    frames = [noise((d.width + 1, d.height + 1), seed) for seed in range(4)]
+    background = noise((d.width + 1, d.height + 1), 99)
+    ball = sprite(12, True)
+    state = {"frame": 0}
+
+    def run():
+        i = state["frame"] = state["frame"] + 1
+        match kind:
+            case "static":
+                d.blit(background, (0, 0))
+            case "sprite":
+                d.blit(background, (0, 0))
+                d.blit(ball, (i % d.width, (i // 3) % d.height))
+            case "noise":
+                d.blit(frames[i % len(frames)], (0, 0))
+        d.update()
+        return d.writer.last_frame_bytes
+    return run, {"bytes": True}
+
+
+for _kind in ("static", "sprite", "noise"):
+    scenario(f"display.update.{_kind}")(lambda kind=_kind: bench_update(kind))
+for _mode in (keys.COLOR256, keys.COLOR16):
+    scenario(f"display.update.noise.{_mode}")(lambda mode=_mode: bench_update("noise", color_mode=mode))
+    scenario(f"display.update.noise.{_mode}.dither")(
+        lambda mode=_mode: bench_update("noise", color_mode=mode, dither=True)
+    )
+
+
+@scenario("events.parse")
+def bench_parse():
+    rng = random.Random(0)
+    chunks = []
+    for _ in range(1000):
+        match rng.randrange(3):
+            case 0:
+                chunks.append(rng.choice("abcxyz1234 \t#").encode())
+            case 1:
+                chunks.append(rng.choice((b"\033[A", b"\033[B", b"\033[C", b"\033[D")))
+            case 2:
+                chunks.append(b"\033[M" + bytes((32 + 35, 32 + rng.randrange(1, 80), 32 + rng.randrange(1, 40))))
+    stream = b"".join(chunks)
+
+    def run():
+        reader = io.BytesIO(stream)
+        while reader.tell() < len(stream):
+            parse(reader.read)
+    return run, {"per_call": len(chunks)}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(name: str, duration: float, min_runs: int) -> dict:
+    run, options = SCENARIOS[name]()
+    run()
+    times, sizes = [], []
+    deadline = time.perf_counter() + duration
+    while len(times) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        value = run()
+        times.append(time.perf_counter() - start)
+        if options.get("bytes"):
+            sizes.append(value)
+    result = {
+        "runs": len(times),
+        "ops_per_sec": options.get("per_call", 1) * len(times) / sum(times),
+        "p50_ms": percentile(times, 0.50) * 1000,
+        "p95_ms": percentile(times, 0.95) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000
+    }
+    if sizes:
+        result["bytes_per_frame"] = sum(sizes) / len(sizes)
+    return result
+
+
+def run_all(names: list[str], duration: float, min_runs: int) -> dict:
+    global TEMP_DIR
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    try:
+        results = {name: measure(name, duration, min_runs) for name in names}
+    finally:
+        if TEMP_DIR is not None:
+            TEMP_DIR.cleanup()
+            TEMP_DIR = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__ if numpy is not None else None,
+        "terminal_size": list(TERMINAL_SIZE),
+        "results": results
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        if result["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: ops/sec {old['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f}"
+            )
+        if "bytes_per_frame" in old and result.get("bytes_per_frame", 0) > old["bytes_per_frame"] * (1 + threshold):
+            regressions.append(
+                f"{name}: bytes/frame {old['bytes_per_frame']:.0f} -> {result['bytes_per_frame']:.0f}"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pyterm.bench", description="pyterm benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="only run scenarios whose name contains this")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("-c", "--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="allowed relative slowdown (default 0.1)")
+    parser.add_argument("-d", "--duration", type=float, default=0.5, help="seconds per scenario (default 0.5)")
+    parser.add_argument("-n", "--min-runs", type=int, default=5, help="minimum runs per scenario (default 5)")
+    parser.add_argument("-l", "--list", action="store_true", help="list scenarios and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in SCENARIOS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    report = run_all(names, args.duration, args.min_runs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,69 @@
+from collections import deque
 import time
 
 
 class Clock:
-    def __init__(self):
+    def __init__(self, window: int = 120, spin: float = 0.002):
         self.start_time = time.perf_counter()
+        self.__deadline: float | None = None
+        self.__frames: deque[float] = deque(maxlen=window)
+        self.__spin: float = spin
+        self.__accumulator: float = 0.0
+        self.__step: float = 0.0
 
-    def tick(self, fps):
-        elapsed_time = time.perf_counter() - self.start_time
-        if elapsed_time < 1/fps:
-            time.sleep(1/fps - elapsed_time)
-        self.start_time = time.perf_counter()
+    def __wait(self, deadline: float) -> None:
+        # time.sleep overshoots by up to a scheduler quantum, so sleep until
+        # shortly before the deadline and spin for the rest.
+        remaining = deadline - time.perf_counter()
+        if remaining > self.__spin:
+            time.sleep(remaining - self.__spin)
+        while time.perf_counter() < deadline:
+            pass
 
-    def get_fps(self):
-        elapsed_time = time.perf_counter() - self.start_time
-        self.start_time = time.perf_counter()
-        return 1 / elapsed_time
+    def tick(self, fps: float = 0) -> float:
+        if fps > 0:
+            period = 1 / fps
+            now = time.perf_counter()
+            deadline = (self.__deadline if self.__deadline is not None else self.start_time) + period
+            if deadline < now - period:
+                # Too far behind to catch up without a burst of short frames.
+                deadline = now
+            self.__wait(deadline)
+            self.__deadline = deadline
+        else:
+            self.__deadline = None
+        now = time.perf_counter()
+        elapsed = now - self.start_time
+        self.start_time = now
+        self.__frames.append(elapsed)
+        return elapsed
+
+    def get_time(self) -> float:
+        return self.__frames[-1] if self.__frames else 0.0
+
+    def get_fps(self) -> float:
+        total = sum(self.__frames)
+        return len(self.__frames) / total if total else 0.0
+
+    def get_percentile_fps(self, q: float) -> float:
+        # FPS of the q-th slowest frame in the window, e.g. q=0.99 for "1% lows".
+        if not self.__frames:
+            return 0.0
+        frames = sorted(self.__frames)
+        frame = frames[min(len(frames) - 1, int(q * len(frames)))]
+        return 1 / frame if frame else 0.0
+
+    def fixed_steps(self, step: float, max_steps: int = 5) -> int:
+        # Number of fixed-size simulation steps to run for the last frame. Time
+        # beyond max_steps is dropped so a slow frame can't snowball.
+        self.__step = step
+        self.__accumulator += self.get_time()
+        steps = min(int(self.__accumulator / step), max_steps)
+        self.__accumulator -= steps * step
+        if steps == max_steps:
+            self.__accumulator %= step
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        return self.__accumulator / self.__step if self.__step else 0.0
@@ -1,48 +1,90 @@
 from pyterm.image import Image
 from pyterm.colors import COLORS
-from PIL import Image as PImage, ImageDraw, ImageFont
+from pyterm.rect import Rect
+from pyterm.renderer import Renderer
+from pyterm.encoder import Encoder
+from pyterm.framebuffer import FrameBuffer, as_area, pack
+from pyterm.presenter import Presenter
+from pyterm.palette import Palette
+from pyterm.output import FrameWriter
+from pyterm.headless import HeadlessTerminal, CaptureWriter
+from pyterm.stats import FrameStats
+from pyterm.text import cache as text_cache
 import sys
-import os
-import pyterm.__events as events
+import time
 import pyterm.keys as keys
 
 
 class Display:
-    def __init__(self, size, *args):
+    def __init__(self, size, *args, cache_size: int = 1024, threaded: bool = False,
+                 color_mode: str = keys.TRUECOLOR, dither: bool = False, sync: bool = False,
+                 headless: bool = False, terminal_size: tuple[int, int] = (80, 24), capture: bool = True,
+                 hud: bool = False):
         self.__size: tuple[int, int] = (size[0], size[1])
-        import blessed
-        self.__terminal: blessed.Terminal = blessed.Terminal()
+        self.__headless: bool = headless
+        if headless:
+            self.__terminal = HeadlessTerminal(terminal_size)
+        else:
+            import blessed
+            import pyterm.__events
+            self.__terminal = blessed.Terminal()
+        self.__args = args
         self.__unpack_args(args)
+        self.__resized: bool = False
         self.__ended: bool = False
-        self.__screen: str = ""
-        self.__pixels: dict[tuple[int, int], tuple[int, int, int]] = {}
-        self.__stdout = sys.stdout
-        self.__stdout.write(self.__terminal.clear())
-        self.__stdout.flush()
+        self.__buffer: FrameBuffer = FrameBuffer((self.__size[0] + 1, self.__size[1] + 1))
+        self.__palette: Palette | None = Palette(color_mode) if color_mode != keys.TRUECOLOR else None
+        self.__encoder: Encoder = Encoder(self.__terminal, cache_size, self.__palette)
+        self.__renderer: Renderer = Renderer(
+            self.__encoder.encode,
+            (lambda buffer: self.__palette.quantize(buffer.data, buffer.width, dither)) if self.__palette else None
+        )
+        if headless:
+            self.__writer: FrameWriter = CaptureWriter(capture, sync)
+        else:
+            sys.stdout.flush()
+            self.__writer: FrameWriter = FrameWriter(sys.stdout.fileno(), sync)
+        self.__presenter: Presenter | None = Presenter(self.__encode, self.__write) if threaded else None
+        self.__writer.write(self.__terminal.clear().encode())
         self._fill = None
         self.__min_width, self.__min_height = self.__terminal.width, self.__terminal.height*2
-        self.__setup()
+        if not headless:
+            self.__setup()
         self.__text = {}
+        self.__layers: dict[str, Image] = {}
+        self.__composed: FrameBuffer | None = None
+        self.__stats: FrameStats = FrameStats()
+        self.hud: bool = hud
+        self.__started: float = time.perf_counter()
+        self.__updated: float = self.__started
 
     def add_raw_text(self, pos, text):
         for index, ch in enumerate(text):
             self.__text[(pos[0] + index, pos[1])] = ch
 
     def add_text(self, pos, text, color, font: str, size: int):
-        imfont = ImageFont.truetype(font, size)
-        img = PImage.new('RGBA', (int(imfont.getlength(text)), size), (255, 255, 255, 0))
-        im = ImageDraw.Draw(img)
-        im.text((0, 0), text, font=imfont, fill=color)
-
-        img = Image.fromPIL(img)
-        self.blit(img, pos)
-
-    def __clear(self):
-        os.system("cls" if os.name == "nt" else "clear")
+        self.blit(text_cache.render(text, color, font, size), pos)
 
     def __on_resize(self, sig, action):
+        # Only flag the resize here; bursts of SIGWINCH during a window drag
+        # collapse into a single reallocation on the next update().
+        self.__resized = True
+
+    def __apply_resize(self) -> None:
+        self.__resized = False
         self.__min_width, self.__min_height = self.__terminal.width, self.__terminal.height*2
-        self.__clear()
+        self.__unpack_args(self.__args)
+        size = (self.__size[0] + 1, self.__size[1] + 1)
+        if size != self.__buffer.size:
+            self.__buffer = self.__buffer.resized(size)
+            # Layers stay full-size so callers keep drawing anywhere on screen.
+            for layer in self.__layers.values():
+                layer.set_canvas_size(size)
+        self.__composed = None
+        self.__renderer.force_full_redraw(clear=True)
+
+    def force_full_redraw(self) -> None:
+        self.__renderer.force_full_redraw()
 
     def __setup(self):
         import signal
@@ -63,23 +105,62 @@ class Display:
     def fill(self, color: tuple[int, int, int] | list[int, int, int] | str | None):
         c = color if not isinstance(color, str) else COLORS[color]
         self.__text = {}
-        if c is None:
-            self.__pixels = {}
-            return
-        for x in range(self.__size[0]+1):
-            for y in range(self.__size[1]):
-                self.__pixels[(x, y)] = (c[0], c[1], c[2])
-
-    def blit(self, image: Image, dest: tuple[int, int] | list[int, int]):
-        for pos, pix in image.pixels.items():
-            if 0 <= pos[0] <= image.width and 0 <= pos[1] <= image.height and pix is not None:
-                self.__pixels[(pos[0] + dest[0], pos[1] + dest[1])] = pix
-        # for i in range(image.width):
-        #     for j in range(image.height):
-        #         pixel = image.get_pixel((i, j))
-        #         if pixel is None:
-        #             continue
-        #         self.__pixels[(i+dest[0], j+dest[1])] = pixel
+        self.__buffer.fill(None)
+        if c is not None:
+            self.__buffer.fill(c, (0, 0, self.__size[0] + 1, self.__size[1]))
+
+    def blit(self, image: Image, dest: tuple[int, int] | list[int, int] | Rect,
+             area: Rect | tuple[int, int, int, int] | None = None, clip: Rect | tuple[int, int, int, int] | None = None,
+             blend: str | None = None):
+        if isinstance(dest, Rect):
+            dest = dest.topleft
+        buffer, dest, area = image.source(dest, area)
+        self.__buffer.blit(buffer, dest, area, blend, clip)
+
+    def hline(self, color: tuple[int, int, int] | list[int, int, int] | str | None, x0: int, x1: int, y: int) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__buffer.hline(x0, x1, y, c)
+
+    def vline(self, color: tuple[int, int, int] | list[int, int, int] | str | None, x: int, y0: int, y1: int) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__buffer.vline(x, y0, y1, c)
+
+    def fill_rect(self, color: tuple[int, int, int] | list[int, int, int] | str | None, rect: Rect | tuple[int, int, int, int]) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__buffer.fill(c, as_area(rect))
+
+    def fill_spans(self, color: tuple[int, int, int] | list[int, int, int] | str | None, spans) -> None:
+        # spans is an iterable of (x0, x1, y) with inclusive ends.
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__buffer.spans(spans, c)
+
+    @property
+    def buffer(self) -> FrameBuffer:
+        return self.__buffer
+
+    @property
+    def encoder(self) -> Encoder:
+        return self.__encoder
+
+    @property
+    def color_mode(self) -> str:
+        return self.__palette.mode if self.__palette is not None else keys.TRUECOLOR
+
+    @property
+    def stats(self) -> FrameStats:
+        return self.__stats
+
+    @property
+    def headless(self) -> bool:
+        return self.__headless
+
+    @property
+    def writer(self) -> FrameWriter:
+        return self.__writer
+
+    @property
+    def presenter(self) -> Presenter | None:
+        return self.__presenter
 
     def __unpack_args(self, args: list | tuple) -> None:
         if keys.FULLSCREEN in args:
@@ -89,71 +170,124 @@ class Display:
         if keys.FULLHEIGHT in args:
             self.__size = (self.__size[0], self.__terminal.height*2-3)
 
+    def blend_pixel(self, pos: tuple[int, int] | list[int, int],
+                    color: tuple[int, int, int] | tuple[int, int, int, int] | list[int] | str,
+                    mode: str = keys.BLEND_OVER) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__buffer.blend_pixel(pos, c, mode)
+
     def get_pixel(self, pos: tuple[int, int] | list[int, int]) -> tuple[int, int, int] | None:
-        return self.__pixels.get(pos, None)
+        return self.__buffer.get(pos)
 
     def put_pixel(self, pos: tuple[int, int] | list[int, int],
                   color: tuple[int, int, int] | list[int, int, int] | str | None) -> None:
         c = color if not isinstance(color, str) else COLORS[color]
-        if c is None and pos in self.__pixels:
-            del self.__pixels[pos]
-        elif c is not None:
-            self.__pixels[pos] = (c[0], c[1], c[2])
+        self.__buffer.put(pos, c)
 
     def join(self, c, x, y):
-        if (x, y) in self.__text.keys():
-            if c[0] is not None and c[1] is not None:
-                return self.__terminal.on_color_rgb(
-                    (c[0][0] + c[1][0])//2, (c[0][1] + c[1][1])//2, (c[0][2] + c[1][2])//2
-                ) + self.__text[(x, y)] + '\033[0m'
-            elif c[1] is not None:
-                return self.__terminal.on_color_rgb(*c[1]) + self.__text[(x, y)] + '\033[0m'
-            elif c[0] is not None:
-                return self.__terminal.on_color_rgb(*c[0]) + self.__text[(x, y)] + '\033[0m'
-            return self.__text[(x, y)]
-        if c[0] is None and c[1] is None:
-            return " "
-        elif c[0] is None:
-            return self.__terminal.color_rgb(*c[1]) + "▄" + '\033[0m'
-        elif c[1] is None:
-            return self.__terminal.color_rgb(*c[0]) + "▀" + '\033[0m'
-        else:
-            return self.__terminal.color_rgb(*c[0]) + self.__terminal.on_color_rgb(*c[1]) + "▀" + '\033[0m'
+        key = pack if self.__palette is None else lambda color: self.__palette.nearest(pack(color))
+        return self.__encoder.encode([
+            (key(c[0]) if c[0] is not None else None, key(c[1]) if c[1] is not None else None, self.__text.get((x, y)))
+        ]).decode()
 
-    def __to_string(self) -> None:
+    def __view(self) -> tuple[int, int]:
         w, h = min(self.__size[0], self.__min_width), min(self.__size[1], self.__min_height)
-        scr: list[list[tuple | None]] = [
-            [
-                None for _ in range(w+1)
-            ] for __ in range(h+1)
-        ]
-        self.__screen = ""
-        for pos, pix in self.__pixels.items():
-            if 0 <= pos[0] <= w and 0 <= pos[1] <= h:
-                scr[pos[1]][pos[0]] = pix
-
-        self.__screen = "\n".join(
-            [
-                "".join(
-                    [
-                        self.join([j, scr[i+1][i2]], i2, i) for i2, j in enumerate(scr[i][:self.__min_width])
-                    ]
-                ) for i in range(0, min(len(scr)-1, self.__min_height-1), 2)
-            ]
-        )
+        return min(w + 1, self.__min_width), min(h, self.__min_height - 1)
+
+    def __encode(self, buffer: FrameBuffer, text: dict[tuple[int, int], str], width: int, height: int,
+                 sample: dict) -> tuple[FrameWriter, dict]:
+        start = time.perf_counter()
+        self.__writer.begin()
+        self.__renderer.render(buffer, text, width, height, self.__writer)
+        sample["encode"] = time.perf_counter() - start
+        sample["cells"] = self.__renderer.changed
+        return self.__writer, sample
+
+    def __write(self, frame: tuple[FrameWriter, dict]) -> None:
+        writer, sample = frame
+        start = time.perf_counter()
+        sample["bytes"] = writer.end()
+        sample["write"] = time.perf_counter() - start
+        self.__stats.record(sample)
+
+    def __draw_hud(self) -> None:
+        for index, line in enumerate(self.__stats.overlay()):
+            self.add_raw_text((0, index * 2), line)
+
+    def layer(self, name: str) -> Image:
+        # Layers are alpha blended over the display's own pixels in creation order.
+        if name not in self.__layers:
+            self.__layers[name] = Image(self.__buffer.size)
+            self.__composed = None
+        return self.__layers[name]
+
+    def remove_layer(self, name: str) -> None:
+        del self.__layers[name]
+        self.__composed = None
+
+    @property
+    def layers(self) -> list[str]:
+        return list(self.__layers)
+
+    def __compose(self) -> FrameBuffer:
+        # Only the dirty rectangles of the display and its layers are merged
+        # again, so static layers cost nothing once they are composed.
+        if not self.__layers:
+            return self.__buffer
+        buffers = [self.__buffer] + [layer.buffer for layer in self.__layers.values()]
+        if self.__composed is None or self.__composed.size != self.__buffer.size:
+            self.__composed = FrameBuffer(self.__buffer.size)
+            areas = [(0, 0, self.__buffer.width, self.__buffer.height)]
+            for buffer in buffers:
+                buffer.take_dirty()
+        else:
+            areas = [area for buffer in buffers for area in buffer.take_dirty()]
+        for area in areas:
+            self.__composed.copy_area(self.__buffer, area)
+            for buffer in buffers[1:]:
+                self.__composed.blit(buffer, area[:2], area, keys.BLEND_OVER)
+        return self.__composed
 
     def update(self) -> None:
-        with self.__terminal.location(0, 0):
-            self.__to_string()
-            self.__stdout.write(self.__screen)
-            self.__stdout.flush()
+        start = time.perf_counter()
+        if self.__resized:
+            self.__apply_resize()
+        buffer = self.__compose()
+        if self.hud:
+            self.__draw_hud()
+        if self.__presenter is not None:
+            frame = buffer.copy(self.__presenter.acquire(buffer.size))
+        # "idle" is the caller's own work since the last update, "compose"
+        # the layer merge, HUD and hand-off copy done here.
+        composed = time.perf_counter()
+        events = sys.modules.get("pyterm.__events")
+        sample = {
+            "frame": start - self.__started,
+            "idle": start - self.__updated,
+            "compose": composed - start,
+            "pixels": len(buffer.mask) - buffer.mask.count(0),
+            "events": len(events.events) if events is not None else 0
+        }
+        self.__started = start
+        if self.__presenter is not None:
+            self.__presenter.submit(frame, dict(self.__text), *self.__view(), sample)
+        else:
+            self.__write(self.__encode(buffer, self.__text, *self.__view(), sample))
+        self.__updated = time.perf_counter()
 
     @property
     def ended(self) -> bool:
         return self.__ended
 
     def exit(self) -> None:
-        self.__stdout.write(self.__terminal.clear())
-        self.__stdout.flush()
-        self.__ended = True
-        events.close()
+        # The terminal is restored even when the presenter re-raises a writer error.
+        try:
+            if self.__presenter is not None:
+                self.__presenter.close()
+        finally:
+            self.__writer.write(self.__terminal.clear().encode())
+            self.__stats.close()
+            self.__ended = True
+            if not self.__headless:
+                import pyterm.__events as events
+                events.close()
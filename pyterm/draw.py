@@ -1,70 +1,323 @@
+from math import isqrt
+from pyterm.colors import COLORS
+from pyterm.rect import Rect
+import pyterm.keys as keys
+import math
+
+
 def rect(surface, color, rectangle, width=0):
-    pos1, pos2, w, h = rectangle
-    for x in range(w):
-        for y in range(h):
-            if width == 0:
-                surface.put_pixel((pos1 + x, pos2 + y), color)
-            elif x < width or x >= w - width:
-                surface.put_pixel((pos1 + x, pos2 + y), color)
-            elif y < width or y >= h - width:
-                surface.put_pixel((pos1 + x, pos2 + y), color)
+    x, y, w, h = rectangle.to_tuple() if isinstance(rectangle, Rect) else rectangle
+    if width < 0 or w <= 0 or h <= 0:
+        return
+    if width == 0 or 2 * width >= w or 2 * width >= h:
+        surface.fill_rect(color, (x, y, w, h))
+        return
+    surface.fill_rect(color, (x, y, w, width))
+    surface.fill_rect(color, (x, y + h - width, w, width))
+    surface.fill_rect(color, (x, y + width, width, h - 2 * width))
+    surface.fill_rect(color, (x + w - width, y + width, width, h - 2 * width))
+
+
+def ceil_half(n):
+    return -((-n) // 2)
+
+
+def ellipse_spans(cx, cy, a, b, thickness=0):
+    # Rows of the ellipse centred on (cx, cy) with radii (a, b), all in half
+    # pixels so that even-sized boxes have exact centres. A pixel is inside
+    # when its centre passes the integer midpoint test x²b² + y²a² <= a²b²;
+    # with a thickness the same test on the shrunken ellipse cuts the hole.
+    ia, ib = a - 2 * thickness, b - 2 * thickness
+    hollow = thickness > 0 and ia > 0 and ib > 0
+    spans = []
+    for py in range(ceil_half(cy - b), (cy + b) // 2 + 1):
+        y = 2 * py - cy
+        xo = isqrt(a * a * (b * b - y * y) // (b * b)) if b else a
+        lo, hi = ceil_half(cx - xo), (cx + xo) // 2
+        if lo > hi:
+            continue
+        if not hollow or y * y >= ib * ib:
+            spans.append((lo, hi, py))
+            continue
+        xi = isqrt((ia * ia * (ib * ib - y * y) - 1) // (ib * ib))
+        hole_lo, hole_hi = ceil_half(cx - xi), (cx + xi) // 2
+        if lo < hole_lo:
+            spans.append((lo, min(hi, hole_lo - 1), py))
+        if hole_hi < hi:
+            spans.append((max(lo, hole_hi + 1), hi, py))
+    return spans
+
+
+def half_plane(alpha, beta, cx):
+    # Pixel columns whose centres satisfy alpha * x + beta >= 0, x in half pixels.
+    if alpha > 0:
+        return ceil_half(math.ceil(-beta / alpha - 1e-9) + cx), math.inf
+    if alpha < 0:
+        return -math.inf, (math.floor(-beta / alpha + 1e-9) + cx) // 2
+    return (-math.inf, math.inf) if beta >= 0 else (math.inf, -math.inf)
+
+
+def sector_spans(spans, cx, cy, start_angle, stop_angle):
+    # Keeps the parts of spans between the two angles, counterclockwise with
+    # y up as in pygame. Each bounding ray is a half-plane, which cuts a row
+    # into at most two runs, so this stays per span rather than per pixel.
+    sweep = stop_angle - start_angle
+    if sweep >= 2 * math.pi:
+        return spans
+    sweep %= 2 * math.pi
+    if sweep == 0:
+        return []
+    sx, sy = math.cos(start_angle), math.sin(start_angle)
+    ex, ey = math.cos(stop_angle), math.sin(stop_angle)
+    out = []
+    for lo, hi, py in spans:
+        up = cy - 2 * py
+        a = half_plane(-sy, sx * up, cx)
+        b = half_plane(ey, -ex * up, cx)
+        if sweep <= math.pi:
+            parts = [(max(a[0], b[0]), min(a[1], b[1]))]
+        elif a[0] <= b[0] <= a[1] + 1 or b[0] <= a[0] <= b[1] + 1:
+            parts = [(min(a[0], b[0]), max(a[1], b[1]))]
+        else:
+            parts = [a, b]
+        for part_lo, part_hi in parts:
+            x0, x1 = max(lo, part_lo), min(hi, part_hi)
+            if x0 <= x1:
+                out.append((int(x0), int(x1), py))
+    return out
+
+
+def box(rectangle):
+    # Centre and radii, in half pixels, of the ellipse inscribed in rectangle.
+    x, y, w, h = rectangle.to_tuple() if isinstance(rectangle, Rect) else rectangle
+    return 2 * x + w - 1, 2 * y + h - 1, w, h
 
 
 def circle(surface, color, position, radius, width=0):
+    if radius < 0:
+        return
     x, y = position
-    for dx in range(-radius, radius+1):
-        for dy in range(-radius, radius+1):
-            if dx**2 + dy**2 <= radius**2 and width == 0:
-                surface.put_pixel((x + dx, y + dy), color)
-            elif radius**2 >= dx**2 + dy**2 >= (radius - width)**2:
-                surface.put_pixel((x + dx, y + dy), color)
-
-
-def line(surface, color, position1, position2, width=1):
-    x1, y1 = position1
-    x2, y2 = position2
-    dx, dy = x2 - x1, y2 - y1
-    length = (dx**2 + dy**2) ** 0.5
-    increment = (width + 1) / length
-    for i in range(int(length) + 1):
-        x = int(x1 + dx * i / length)
-        y = int(y1 + dy * i / length)
-        for w1 in range(width):
-            for w2 in range(width):
-                surface.put_pixel((x + w1 - width//2, y + w2 - width//2), color)
-
-
-def polygon(surface, color, positions, filling: bool = True):
-    if not filling:
-        for i in range(len(positions) - 1):
-            line(surface, color, positions[i], positions[i + 1])
-        line(surface, color, positions[-1], positions[0])
+    surface.fill_spans(color, ellipse_spans(2 * x, 2 * y, 2 * radius, 2 * radius, max(0, width)))
+
+
+def ellipse(surface, color, rectangle, width=0):
+    cx, cy, a, b = box(rectangle)
+    if a <= 0 or b <= 0:
+        return
+    surface.fill_spans(color, ellipse_spans(cx, cy, a, b, max(0, width)))
+
+
+def arc(surface, color, rectangle, start_angle, stop_angle, width=1):
+    cx, cy, a, b = box(rectangle)
+    if a <= 0 or b <= 0 or width <= 0:
+        return
+    surface.fill_spans(color, sector_spans(ellipse_spans(cx, cy, a, b, width), cx, cy, start_angle, stop_angle))
+
+
+def pie(surface, color, rectangle, start_angle, stop_angle):
+    cx, cy, a, b = box(rectangle)
+    if a <= 0 or b <= 0:
+        return
+    surface.fill_spans(color, sector_spans(ellipse_spans(cx, cy, a, b), cx, cy, start_angle, stop_angle))
+
+
+def point(position):
+    # Bresenham steps by whole pixels and only stops on the exact end point,
+    # so float positions are truncated first, as draw.line always did.
+    return int(position[0]), int(position[1])
+
+
+def line_spans(x0, y0, x1, y1):
+    # Integer Bresenham; pixels on the same row are merged into one span.
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+    error = dx + dy
+    spans = []
+    start = x0
+    while True:
+        if x0 == x1 and y0 == y1:
+            spans.append((start, x0, y0))
+            return spans
+        e2 = 2 * error
+        if e2 >= dy:
+            error += dy
+            x0 += sx
+        if e2 <= dx:
+            error += dx
+            spans.append((start, x0 - sx if e2 >= dy else x0, y0))
+            y0 += sy
+            start = x0
+
+
+def convex_spans(points):
+    # Rows of pixel centres inside a convex polygon given as float corners,
+    # half-open on the right and bottom so that a w wide shape covers w pixels.
+    top = math.ceil(min(y for _, y in points) - 1e-9)
+    bottom = math.ceil(max(y for _, y in points) - 1e-9)
+    edges = [(points[i], points[(i + 1) % len(points)]) for i in range(len(points))]
+    spans = []
+    for y in range(top, bottom):
+        left, right = math.inf, -math.inf
+        for (ax, ay), (bx, by) in edges:
+            if min(ay, by) - 1e-9 <= y <= max(ay, by) + 1e-9:
+                if ay == by:
+                    left, right = min(left, ax, bx), max(right, ax, bx)
+                else:
+                    x = ax + (min(max(y, min(ay, by)), max(ay, by)) - ay) * (bx - ax) / (by - ay)
+                    left, right = min(left, x), max(right, x)
+        lo, hi = math.ceil(left - 1e-9), math.ceil(right - 1e-9) - 1
+        if lo <= hi:
+            spans.append((lo, hi, y))
+    return spans
+
+
+def cap_spans(x, y, width):
+    return ellipse_spans(*box((x - width // 2, y - width // 2, width, width)))
+
+
+def thick_spans(x0, y0, x1, y1, width):
+    # The segment as a width-wide quad, with round caps at both ends.
+    spans = cap_spans(x0, y0, width)
+    if (x0, y0) == (x1, y1):
+        return spans
+    length = math.hypot(x1 - x0, y1 - y0)
+    nx, ny = -(y1 - y0) / length * width / 2, (x1 - x0) / length * width / 2
+    spans += convex_spans([(x0 + nx, y0 + ny), (x1 + nx, y1 + ny), (x1 - nx, y1 - ny), (x0 - nx, y0 - ny)])
+    spans += cap_spans(x1, y1, width)
+    return spans
+
+
+def wu(surface, color, x0, y0, x1, y1):
+    # Xiaolin Wu's line, blending each pixel pair by its coverage so it works
+    # over whatever is already on an RGBA surface.
+    color = COLORS[color] if isinstance(color, str) else color
+    x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+    r, g, b = color[0], color[1], color[2]
+    opacity = color[3] if len(color) > 3 else 255
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    if steep:
+        x0, y0, x1, y1 = y0, x0, y1, x1
+    if x0 > x1:
+        x0, y0, x1, y1 = x1, y1, x0, y0
+    gradient = (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+    y = float(y0)
+    for x in range(x0, x1 + 1):
+        iy = math.floor(y)
+        fraction = y - iy
+        for py, coverage in ((iy, 1 - fraction), (iy + 1, fraction)):
+            a = round(opacity * coverage)
+            if a:
+                surface.blend_pixel((py, x) if steep else (x, py), (r, g, b, a))
+        y += gradient
+
+
+def segment_spans(start, end, width):
+    x0, y0 = point(start)
+    x1, y1 = point(end)
+    return line_spans(x0, y0, x1, y1) if width == 1 else thick_spans(x0, y0, x1, y1, width)
+
+
+def line(surface, color, position1, position2, width=1, antialias=False):
+    # Anti-aliasing applies to one pixel wide lines only.
+    if width < 1:
+        return
+    position1, position2 = point(position1), point(position2)
+    if antialias and width == 1:
+        wu(surface, color, *position1, *position2)
         return
-    # Draw the outline
-    polygon(surface, color, positions, filling=False)
-
-    # Find the bounding box of the polygon
-    min_x = min(x for x, _ in positions)
-    max_x = max(x for x, _ in positions)
-    min_y = min(y for _, y in positions)
-    max_y = max(y for _, y in positions)
-
-    # Fill the polygon using a scanline algorithm
-    for y in range(min_y, max_y + 1):
-        intersections = []
-        for i in range(len(positions)):
-            x1, y1 = positions[i]
-            x2, y2 = positions[(i + 1) % len(positions)]
-            if y1 > y2:
-                x1, y1, x2, y2 = x2, y2, x1, y1
-            if y1 <= y < y2 and y2 > y1:
-                x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
-                intersections.append(x)
-
-        intersections.sort()
-        for i in range(0, len(intersections), 2):
-            if i + 1 < len(intersections):
-                start = int(intersections[i])
-                end = int(intersections[i + 1])
-                for x in range(start, end + 1):
-                    surface.put_pixel((x, y), color)
+    surface.fill_spans(color, segment_spans(position1, position2, width))
+
+
+def lines(surface, color, closed, points, width=1, antialias=False):
+    # The whole polyline is collected first and filled in one call.
+    if width < 1 or not points:
+        return
+    points = [point(position) for position in points]
+    segments = list(zip(points, points[1:]))
+    if closed and len(points) > 2:
+        segments.append((points[-1], points[0]))
+    if not segments:
+        segments = [(points[0], points[0])]
+    if antialias and width == 1:
+        for start, end in segments:
+            wu(surface, color, *start, *end)
+        return
+    spans = []
+    for start, end in segments:
+        spans += segment_spans(start, end, width)
+    surface.fill_spans(color, spans)
+
+
+def polygon_spans(positions, rule=keys.EVEN_ODD):
+    # Scanline fill over a sorted edge table. Each edge enters the active
+    # list at its first row and leaves after its last, so a row costs only the
+    # edges crossing it. x is recomputed from the edge's start rather than
+    # stepped so integer vertices give exact crossings. Pixel centres on the
+    # left and top edges are inside, those on the right and bottom are not.
+    edges = []
+    for i in range(len(positions)):
+        (x0, y0), (x1, y1) = positions[i], positions[(i + 1) % len(positions)]
+        direction = 1
+        if y0 > y1:
+            x0, y0, x1, y1, direction = x1, y1, x0, y0, -1
+        top, bottom = math.ceil(y0), math.ceil(y1)
+        if top < bottom:
+            edges.append((top, bottom, x0, y0, x1 - x0, y1 - y0, direction))
+    if rule not in (keys.EVEN_ODD, keys.NONZERO):
+        raise ValueError(f"Invalid fill rule: {rule}")
+    edges.sort(key=lambda edge: edge[0])
+    spans, active = [], []
+    i, y = 0, 0
+    while i < len(edges) or active:
+        if not active:
+            y = edges[i][0]
+        while i < len(edges) and edges[i][0] == y:
+            active.append(edges[i][1:])
+            i += 1
+        crossings = sorted((x0 + (y - y0) * dx / dy, direction) for _, x0, y0, dx, dy, direction in active)
+        if rule == keys.EVEN_ODD:
+            for j in range(0, len(crossings) - 1, 2):
+                lo, hi = math.ceil(crossings[j][0]), math.ceil(crossings[j + 1][0]) - 1
+                if lo <= hi:
+                    spans.append((lo, hi, y))
+        else:
+            winding = 0
+            for x, direction in crossings:
+                if not winding:
+                    start = x
+                winding += direction
+                if not winding:
+                    lo, hi = math.ceil(start), math.ceil(x) - 1
+                    if lo <= hi:
+                        spans.append((lo, hi, y))
+        y += 1
+        active = [edge for edge in active if edge[0] > y]
+    return spans
+
+
+def outline_spans(positions):
+    spans = []
+    for i in range(len(positions)):
+        (x0, y0), (x1, y1) = point(positions[i - 1]), point(positions[i])
+        spans += line_spans(x0, y0, x1, y1)
+    return spans
+
+
+def polygon(surface, color, positions, filling: bool = True, rule=keys.EVEN_ODD):
+    if not positions:
+        return
+    spans = outline_spans(positions)
+    if filling:
+        spans += polygon_spans(positions, rule)
+    surface.fill_spans(color, spans)
+
+
+def polygons(surface, color, shapes, filling: bool = True, rule=keys.EVEN_ODD):
+    # Many polygons in one color, filled with a single call.
+    spans = []
+    for positions in shapes:
+        if positions:
+            spans += outline_spans(positions)
+            if filling:
+                spans += polygon_spans(positions, rule)
+    surface.fill_spans(color, spans)
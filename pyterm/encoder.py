@@ -0,0 +1,85 @@
+from pyterm.escapes import EscapeCache
+from pyterm.framebuffer import unpack
+from pyterm.palette import Palette
+
+RESET = b"\033[0m"
+DEFAULT_FG = b"\033[39m"
+DEFAULT_BG = b"\033[49m"
+SPACE = b" "
+UPPER = "▀".encode()
+LOWER = "▄".encode()
+
+ANY = object()
+
+
+def average(a: int, b: int) -> int:
+    return ((a >> 1) & 0x7F7F7F) + ((b >> 1) & 0x7F7F7F) + (a & b & 0x010101)
+
+
+class Encoder:
+    def __init__(self, terminal, cache_size: int = 1024, palette: Palette | None = None):
+        # Without a palette cells carry packed truecolor values, with one they
+        # carry palette indices produced by Palette.quantize.
+        if palette is None:
+            self.__fg_cache = EscapeCache(lambda color: terminal.color_rgb(*unpack(color)), cache_size)
+            self.__bg_cache = EscapeCache(lambda color: terminal.on_color_rgb(*unpack(color)), cache_size)
+            self.__blend = average
+        else:
+            self.__fg_cache = EscapeCache(palette.fg, cache_size)
+            self.__bg_cache = EscapeCache(palette.bg, cache_size)
+            self.__blend = palette.blend
+
+    @property
+    def fg_cache(self) -> EscapeCache:
+        return self.__fg_cache
+
+    @property
+    def bg_cache(self) -> EscapeCache:
+        return self.__bg_cache
+
+    def fg(self, color: int | None) -> bytes:
+        return DEFAULT_FG if color is None else self.__fg_cache.get(color)
+
+    def bg(self, color: int | None) -> bytes:
+        return DEFAULT_BG if color is None else self.__bg_cache.get(color)
+
+    def choose(self, cell, fg, bg) -> tuple:
+        # Returns (glyph, fg, bg) for the cell, picking between the half blocks
+        # and a space so that as few of the current colors change as possible.
+        top, bottom = cell[0], cell[1]
+        text = cell[2] if len(cell) > 2 else None
+        if text is not None:
+            if top is not None and bottom is not None:
+                return text.encode(), None, self.__blend(top, bottom)
+            return text.encode(), None, bottom if bottom is not None else top
+        if top is None and bottom is None:
+            return SPACE, ANY, None
+        if top is None:
+            return LOWER, bottom, None
+        if bottom is None:
+            return UPPER, top, None
+        if top == bottom:
+            return SPACE, ANY, top
+        if (fg != bottom) + (bg != top) < (fg != top) + (bg != bottom):
+            return LOWER, bottom, top
+        return UPPER, top, bottom
+
+    def encode(self, cells) -> bytes:
+        out = []
+        fg = bg = None
+        for cell in cells:
+            glyph, new_fg, new_bg = self.choose(cell, fg, bg)
+            if new_fg is ANY:
+                new_fg = fg
+            if new_fg != fg and new_bg != bg and new_fg is None and new_bg is None:
+                out.append(RESET)
+            else:
+                if new_fg != fg:
+                    out.append(self.fg(new_fg))
+                if new_bg != bg:
+                    out.append(self.bg(new_bg))
+            fg, bg = new_fg, new_bg
+            out.append(glyph)
+        if fg is not None or bg is not None:
+            out.append(RESET)
+        return b"".join(out)
@@ -0,0 +1,54 @@
+from typing import Callable
+
+
+class EscapeCache:
+    def __init__(self, format: Callable[[int], str], size: int = 1024):
+        if size <= 0 or size & (size - 1):
+            raise ValueError(f"Cache size must be a power of two: {size}")
+        self.__format = format
+        self.__size = size
+        self.__shift = 33 - size.bit_length()
+        self.__keys: list[int] = [-1] * size
+        self.__values: list[bytes] = [b""] * size
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, color: int) -> bytes:
+        # Keys are packed colors or palette indices. Direct-mapped: each key
+        # has exactly one slot (picked with a Fibonacci hash), so a lookup is
+        # two list reads and a miss simply overwrites whatever lived there.
+        i = (color * 0x9E3779B1 & 0xFFFFFFFF) >> self.__shift
+        if self.__keys[i] == color:
+            self.__hits += 1
+            return self.__values[i]
+        self.__misses += 1
+        value = self.__format(color).encode()
+        self.__keys[i] = color
+        self.__values[i] = value
+        return value
+
+    def clear(self) -> None:
+        self.__keys = [-1] * self.__size
+        self.__values = [b""] * self.__size
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.__hits + self.__misses
+        return self.__hits / total if total else 0.0
@@ -1 +1,3 @@
-from pyterm.__events import get
+def get():
+    import pyterm.__events as events
+    return events.get()
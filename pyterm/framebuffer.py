@@ -0,0 +1,360 @@
+from typing import Self
+from array import array
+from pyterm.rect import Rect
+import pyterm.keys as keys
+import re
+import sys
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TRANSPARENT = 0
+OPAQUE = 255
+MAX_DIRTY = 16
+DIRTY_GAP = 8
+
+_OPAQUE_RUNS = re.compile(rb"[^\x00]+")
+
+
+def pack(color: tuple[int, int, int] | list[int, int, int]) -> int:
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+def unpack(value: int) -> tuple[int, int, int]:
+    return value >> 16 & 255, value >> 8 & 255, value & 255
+
+
+def runs(mask) -> list[tuple[int, int]]:
+    return [match.span() for match in _OPAQUE_RUNS.finditer(mask)]
+
+
+def as_area(area: Rect | tuple[int, int, int, int] | list[int] | None) -> tuple[int, int, int, int] | None:
+    return area.to_tuple() if isinstance(area, Rect) else area
+
+
+def alpha(color) -> int:
+    return OPAQUE if len(color) < 4 else max(0, min(OPAQUE, color[3]))
+
+
+def blend(source: int, source_alpha: int, dest: int, dest_alpha: int, mode: str) -> tuple[int, int]:
+    # Porter-Duff over on premultiplied channels; colors are stored straight
+    # so the result is divided back by its alpha.
+    inverse = 255 - source_alpha
+    out_alpha = source_alpha + (dest_alpha * inverse + 127) // 255
+    if not out_alpha:
+        return 0, TRANSPARENT
+    out = 0
+    for shift in (16, 8, 0):
+        s = ((source >> shift & 255) * source_alpha + 127) // 255
+        d = ((dest >> shift & 255) * dest_alpha + 127) // 255
+        match mode:
+            case keys.BLEND_OVER:
+                c = s + (d * inverse + 127) // 255
+            case keys.BLEND_ADD:
+                c = min(255, s + d)
+            case keys.BLEND_MULTIPLY:
+                c = (s * d + s * (255 - dest_alpha) + d * inverse + 127) // 255
+            case _:
+                raise ValueError(f"Invalid blend mode: {mode}")
+        out |= min(255, (c * 255 + out_alpha // 2) // out_alpha) << shift
+    return out, out_alpha
+
+
+def blend_arrays(source, source_alpha, dest, dest_alpha, mode: str) -> None:
+    # numpy version of blend, writing into the dest views in place.
+    sa = source_alpha.astype(np.uint32)
+    da = dest_alpha.astype(np.uint32)
+    inverse = 255 - sa
+    out_alpha = sa + (da * inverse + 127) // 255
+    divisor = np.maximum(out_alpha, 1)
+    out = np.zeros(dest.shape, dtype=np.uint32)
+    for shift in (16, 8, 0):
+        s = ((source >> shift & 255) * sa + 127) // 255
+        d = ((dest >> shift & 255) * da + 127) // 255
+        match mode:
+            case keys.BLEND_OVER:
+                c = s + (d * inverse + 127) // 255
+            case keys.BLEND_ADD:
+                c = np.minimum(s + d, 255)
+            case keys.BLEND_MULTIPLY:
+                c = (s * d + s * (255 - da) + d * inverse + 127) // 255
+            case _:
+                raise ValueError(f"Invalid blend mode: {mode}")
+        out |= np.minimum((c * 255 + divisor // 2) // divisor, 255) << shift
+    visible = sa > 0
+    dest[visible] = out[visible]
+    dest_alpha[visible] = out_alpha[visible]
+
+
+class FrameBuffer:
+    def __init__(self, size: tuple[int, int] | list[int, int],
+                 data: memoryview | None = None, mask: memoryview | None = None):
+        # data and mask may wrap external memory such as a mapped file, as an
+        # 'I' and a 'B' memoryview of width * height items.
+        self.__width: int = max(0, size[0])
+        self.__height: int = max(0, size[1])
+        if data is None or mask is None:
+            data, mask = array('I', bytes(4 * self.__width * self.__height)), bytearray(self.__width * self.__height)
+        elif len(data) != self.__width * self.__height or len(mask) != len(data):
+            raise ValueError(f"Buffers do not match size {self.__width}x{self.__height}")
+        self.__data: array | memoryview = data
+        self.__mask: bytearray | memoryview = mask
+        # Row copies from mapped sources go through a memoryview, which accepts
+        # either kind of storage.
+        self.__pixels: memoryview = memoryview(data)
+        self.__dirty: list[list[int]] = []
+
+    @property
+    def data(self) -> array | memoryview:
+        return self.__data
+
+    @property
+    def mask(self) -> bytearray | memoryview:
+        return self.__mask
+
+    @property
+    def width(self) -> int:
+        return self.__width
+
+    @property
+    def height(self) -> int:
+        return self.__height
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__width, self.__height
+
+    @property
+    def dirty(self) -> list[Rect]:
+        return [Rect(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in self.__dirty]
+
+    def mark(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        # Rectangles within DIRTY_GAP of the most recent one grow it, so
+        # scattered put_pixel calls from the transforms collapse into a few boxes.
+        dirty = self.__dirty
+        if dirty:
+            last = dirty[-1]
+            if (x0 <= last[2] + DIRTY_GAP and last[0] <= x1 + DIRTY_GAP and
+                    y0 <= last[3] + DIRTY_GAP and last[1] <= y1 + DIRTY_GAP):
+                if x0 < last[0]:
+                    last[0] = x0
+                if y0 < last[1]:
+                    last[1] = y0
+                if x1 > last[2]:
+                    last[2] = x1
+                if y1 > last[3]:
+                    last[3] = y1
+                return
+        dirty.append([x0, y0, x1, y1])
+        if len(dirty) > MAX_DIRTY:
+            self.__dirty = [[
+                min(r[0] for r in dirty), min(r[1] for r in dirty), max(r[2] for r in dirty), max(r[3] for r in dirty)
+            ]]
+
+    def take_dirty(self) -> list[tuple[int, int, int, int]]:
+        dirty, self.__dirty = self.__dirty, []
+        return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in dirty]
+
+    def index(self, pos: tuple[int, int] | list[int, int]) -> int | None:
+        x, y = pos[0], pos[1]
+        if 0 <= x < self.__width and 0 <= y < self.__height:
+            return y * self.__width + x
+        return None
+
+    def get(self, pos: tuple[int, int] | list[int, int]) -> tuple[int, int, int] | None:
+        i = self.index(pos)
+        if i is None or not self.__mask[i]:
+            return None
+        return unpack(self.__data[i])
+
+    def put(self, pos: tuple[int, int] | list[int, int], color: tuple[int, int, int] | list[int, int, int] | None) -> None:
+        x, y = pos[0], pos[1]
+        if not (0 <= x < self.__width and 0 <= y < self.__height):
+            return
+        i = y * self.__width + x
+        # Called per pixel by the transforms, so the common case of a point
+        # inside the last dirty box skips mark().
+        last = self.__dirty[-1] if self.__dirty else None
+        if last is None or not (last[0] <= x < last[2] and last[1] <= y < last[3]):
+            self.mark(x, y, x + 1, y + 1)
+        if color is None:
+            self.__mask[i] = TRANSPARENT
+        else:
+            self.__data[i] = (color[0] << 16) | (color[1] << 8) | color[2]
+            self.__mask[i] = alpha(color)
+
+    def blend_pixel(self, pos: tuple[int, int] | list[int, int], color: tuple[int, int, int] | list[int],
+                    mode: str = keys.BLEND_OVER) -> None:
+        i = self.index(pos)
+        if i is None:
+            return
+        self.mark(pos[0], pos[1], pos[0] + 1, pos[1] + 1)
+        self.__data[i], self.__mask[i] = blend(pack(color), alpha(color), self.__data[i], self.__mask[i], mode)
+
+    def fill(self, color: tuple[int, int, int] | list[int, int, int] | None,
+             area: tuple[int, int, int, int] | None = None) -> None:
+        x, y, w, h = area if area is not None else (0, 0, self.__width, self.__height)
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.__width, x + w), min(self.__height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.mark(x0, y0, x1, y1)
+        if x0 == 0 and x1 == self.__width:
+            # Whole rows are contiguous, so they can be filled as one slice.
+            x0, x1, y0, y1 = y0 * self.__width, y1 * self.__width, 0, 1
+        n = x1 - x0
+        mask = bytes(n) if color is None else bytes([alpha(color)]) * n
+        data = None if color is None else array('I', [pack(color)]) * n
+        for row in range(y0, y1):
+            s = row * self.__width + x0
+            self.__mask[s:s + n] = mask
+            if data is not None:
+                self.__data[s:s + n] = data
+
+    def spans(self, spans, color: tuple[int, int, int] | list[int, int, int] | None) -> None:
+        # Fills (x0, x1, y) runs, ends inclusive and in either order, packing
+        # the color once for the whole batch.
+        width, height = self.__width, self.__height
+        if color is None:
+            value = mask_value = 0
+        else:
+            value, mask_value = pack(color), alpha(color)
+        data, mask = array('I', [value]), bytes([mask_value])
+        top, bottom, left, right = height, -1, width, -1
+        for x0, x1, y in spans:
+            if x0 > x1:
+                x0, x1 = x1, x0
+            if not 0 <= y < height or x1 < 0 or x0 >= width:
+                continue
+            x0, x1 = max(0, x0), min(width - 1, x1)
+            n = x1 - x0 + 1
+            if n > len(mask):
+                data, mask = array('I', [value]) * (2 * n), bytes([mask_value]) * (2 * n)
+            s = y * width + x0
+            self.__mask[s:s + n] = mask[:n]
+            if color is not None:
+                self.__data[s:s + n] = data[:n]
+            top, bottom, left, right = min(top, y), max(bottom, y), min(left, x0), max(right, x1)
+        if top <= bottom:
+            self.mark(left, top, right + 1, bottom + 1)
+
+    def hline(self, x0: int, x1: int, y: int, color: tuple[int, int, int] | list[int, int, int] | None) -> None:
+        self.spans(((x0, x1, y),), color)
+
+    def vline(self, x: int, y0: int, y1: int, color: tuple[int, int, int] | list[int, int, int] | None) -> None:
+        if y0 > y1:
+            y0, y1 = y1, y0
+        self.fill(color, (x, y0, 1, y1 - y0 + 1))
+
+    def blit(self, source: Self, dest: tuple[int, int] | list[int, int],
+             area: Rect | tuple[int, int, int, int] | None = None, blend: str | None = None,
+             clip: Rect | tuple[int, int, int, int] | None = None) -> None:
+        # area is the part of source to copy, in source coordinates; its
+        # top-left corner lands on dest. clip limits the pixels written, in
+        # destination coordinates. Everything is intersected up front so only
+        # visible rows are touched. Without a blend mode source pixels replace
+        # the destination, alpha included.
+        ax, ay, aw, ah = as_area(area) if area is not None else (0, 0, source.width, source.height)
+        cx, cy, cw, ch = as_area(clip) if clip is not None else (0, 0, self.__width, self.__height)
+        dx, dy = dest[0] - ax, dest[1] - ay
+        x0 = max(0, ax, cx - dx, -dx)
+        y0 = max(0, ay, cy - dy, -dy)
+        x1 = min(source.width, ax + aw, cx + cw - dx, self.__width - dx)
+        y1 = min(source.height, ay + ah, cy + ch - dy, self.__height - dy)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.mark(x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+        if blend is not None:
+            self.__blend(source, dx, dy, x0, y0, x1, y1, blend)
+            return
+        data, mask = source.data, source.mask
+        # Arrays only accept arrays in slice assignment, mapped sources go through the memoryview.
+        mapped = isinstance(data, memoryview)
+        pixels = self.__pixels if mapped else self.__data
+        for y in range(y0, y1):
+            s = y * source.width
+            d = (y + dy) * self.__width + dx
+            row = mask[s + x0:s + x1]
+            if mapped:
+                row = row.tobytes()
+            if TRANSPARENT not in row:
+                pixels[d + x0:d + x1] = data[s + x0:s + x1]
+                self.__mask[d + x0:d + x1] = row
+                continue
+            for start, end in runs(row):
+                pixels[d + x0 + start:d + x0 + end] = data[s + x0 + start:s + x0 + end]
+                self.__mask[d + x0 + start:d + x0 + end] = row[start:end]
+
+    def __blend(self, source: Self, dx: int, dy: int, x0: int, y0: int, x1: int, y1: int, mode: str) -> None:
+        if mode not in (keys.BLEND_OVER, keys.BLEND_ADD, keys.BLEND_MULTIPLY):
+            raise ValueError(f"Invalid blend mode: {mode}")
+        if np is not None:
+            shape, source_shape = (self.__height, self.__width), (source.height, source.width)
+            blend_arrays(
+                np.frombuffer(source.data, dtype=np.uint32).reshape(source_shape)[y0:y1, x0:x1],
+                np.frombuffer(source.mask, dtype=np.uint8).reshape(source_shape)[y0:y1, x0:x1],
+                np.frombuffer(self.__data, dtype=np.uint32).reshape(shape)[y0 + dy:y1 + dy, x0 + dx:x1 + dx],
+                np.frombuffer(self.__mask, dtype=np.uint8).reshape(shape)[y0 + dy:y1 + dy, x0 + dx:x1 + dx],
+                mode
+            )
+            return
+        data, mask = source.data, source.mask
+        for y in range(y0, y1):
+            s = y * source.width + x0
+            d = (y + dy) * self.__width + x0 + dx
+            row = mask[s:s + x1 - x0]
+            if isinstance(row, memoryview):
+                row = row.tobytes()
+            if mode == keys.BLEND_OVER and row.count(OPAQUE) == len(row):
+                self.__pixels[d:d + len(row)] = data[s:s + len(row)]
+                self.__mask[d:d + len(row)] = row
+                continue
+            for i, a in enumerate(row):
+                if a:
+                    self.__data[d + i], self.__mask[d + i] = blend(
+                        data[s + i], a, self.__data[d + i], self.__mask[d + i], mode
+                    )
+
+    def copy_area(self, source: Self, area: tuple[int, int, int, int]) -> None:
+        # Copies pixels and transparency of the same area of an equally sized
+        # buffer, overwriting what is there.
+        x, y, w, h = area
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.__width, source.width, x + w), min(self.__height, source.height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.mark(x0, y0, x1, y1)
+        for row in range(y0, y1):
+            s, d = row * source.width, row * self.__width
+            self.__pixels[d + x0:d + x1] = source.data[s + x0:s + x1]
+            self.__mask[d + x0:d + x1] = source.mask[s + x0:s + x1]
+
+    def load_rgba(self, raw: bytes) -> None:
+        # Takes width * height RGBA bytes, as returned by PIL's tobytes(), and
+        # reorders the channels with strided slices instead of per pixel.
+        if len(raw) != 4 * self.__width * self.__height:
+            raise ValueError(f"Expected {4 * self.__width * self.__height} bytes, got {len(raw)}")
+        r, g, b = (2, 1, 0) if sys.byteorder == "little" else (1, 2, 3)
+        packed = bytearray(len(raw))
+        packed[r::4], packed[g::4], packed[b::4] = raw[0::4], raw[1::4], raw[2::4]
+        self.__data = array('I')
+        self.__data.frombytes(packed)
+        self.__pixels = memoryview(self.__data)
+        self.__mask = bytearray(raw[3::4])
+        self.mark(0, 0, self.__width, self.__height)
+
+    def copy(self, into: Self | None = None) -> Self:
+        buffer = into if into is not None and into.size == self.size else FrameBuffer(self.size)
+        buffer.__pixels[:] = self.__data
+        buffer.mask[:] = self.__mask
+        return buffer
+
+    def resized(self, size: tuple[int, int]) -> Self:
+        buffer = FrameBuffer(size)
+        width, height = min(self.__width, buffer.width), min(self.__height, buffer.height)
+        for y in range(height):
+            s, d = y * self.__width, y * buffer.width
+            buffer.__pixels[d:d + width] = self.__data[s:s + width]
+            buffer.mask[d:d + width] = self.__mask[s:s + width]
+        return buffer
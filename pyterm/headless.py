@@ -0,0 +1,60 @@
+from pyterm.output import FrameWriter
+import time
+
+
+class HeadlessTerminal:
+    def __init__(self, size: tuple[int, int] | list[int, int] = (80, 24)):
+        self.width: int = size[0]
+        self.height: int = size[1]
+        self.number_of_colors: int = 1 << 24
+
+    def clear(self) -> str:
+        return "\033[H\033[2J"
+
+    def color_rgb(self, r: int, g: int, b: int) -> str:
+        return f"\033[38;2;{r};{g};{b}m"
+
+    def on_color_rgb(self, r: int, g: int, b: int) -> str:
+        return f"\033[48;2;{r};{g};{b}m"
+
+
+class CaptureWriter(FrameWriter):
+    def __init__(self, capture: bool = True, sync: bool = False):
+        super().__init__(-1, sync)
+        self.__capture = capture
+        self.__output: list[bytes] = []
+        self.__times: list[float] = []
+        self.__start = 0.0
+        self.__frame: bytes | None = None
+
+    def begin(self) -> None:
+        self.__start = time.perf_counter()
+        super().begin()
+
+    def end(self) -> int:
+        # output[i] and times[i] describe the same frame; an empty frame is b"".
+        self.__frame = b""
+        written = super().end()
+        if self.__capture:
+            self.__output.append(self.__frame)
+        self.__times.append(time.perf_counter() - self.__start)
+        self.__frame = None
+        return written
+
+    def write(self, data: bytes | memoryview) -> None:
+        # Writes outside a frame, like the clear screen on start and exit, are
+        # not captured.
+        if self.__frame is not None and self.__capture:
+            self.__frame = bytes(data)
+
+    def clear(self) -> None:
+        self.__output.clear()
+        self.__times.clear()
+
+    @property
+    def output(self) -> list[bytes]:
+        return self.__output
+
+    @property
+    def times(self) -> list[float]:
+        return self.__times
@@ -1,32 +1,70 @@
 from typing import Self
 from pyterm.colors import COLORS
 from pyterm.rect import Rect
+from pyterm.encoder import Encoder
+from pyterm.framebuffer import FrameBuffer, as_area, pack, unpack
+from pyterm.renderer import split_rows, cells
+import pyterm.keys as keys
 from PIL import Image as PImage
-from PIL import ImageDraw
-from PIL import ImageFont
+from array import array
+import mmap
 import os
+import struct
+import sys
+import tempfile
+
+# Pre-decoded images: header, little-endian packed pixels, then one alpha byte per pixel.
+RAW_EXTENSION = ".ptraw"
+RAW_MAGIC = b"PTRW"
+RAW_VERSION = 1
+RAW_HEADER = struct.Struct("<4sHHII")
 
 
 class Image:
+    __encoder: Encoder | None = None
+
     def __init__(self, size: tuple[int, int] | list[int, int]):
         self.__size: tuple[int, int] = (size[0], size[1])
         self.__image: str = ""
-        self.__pixels: dict[tuple[int, int], tuple[int, int, int]] = {}
-        import blessed
-        self.__terminal = blessed.Terminal()
+        self.__buffer: FrameBuffer = FrameBuffer(self.__size)
+        self.__shared: bool = False
 
     def add_text(self, pos, text, color, font, size):
-        imfont = ImageFont.truetype(font, size)
-        img = PImage.new('RGBA', (int(imfont.getlength(text)), size), (255, 255, 255, 0))
-        im = ImageDraw.Draw(img)
-        im.text((0, 0), text, font=imfont, fill=color)
+        from pyterm.text import cache
+        self.blit(cache.render(text, color, font, size), pos)
+
+    @property
+    def pixels(self) -> dict[tuple[int, int], tuple[int, int, int]]:
+        data, mask, w = self.__buffer.data, self.__buffer.mask, self.__size[0]
+        return {(i % w, i // w): unpack(data[i]) for i in range(len(mask)) if mask[i]}
 
-        img = Image.fromPIL(img)
-        self.blit(img, pos)
+    @property
+    def buffer(self) -> FrameBuffer:
+        # Handing out the buffer may lead to writes, so a shared one is copied first.
+        return self.__own()
+
+    def __own(self) -> FrameBuffer:
+        if self.__shared:
+            self.__buffer = self.__buffer.copy()
+            self.__shared = False
+        return self.__buffer
+
+    def share(self) -> Self:
+        # A new Image reading the same pixels; whichever side writes first
+        # gets its own copy.
+        image = Image.__wrap(self.__buffer)
+        image.__shared = self.__shared = True
+        return image
+
+    @staticmethod
+    def __wrap(buffer: FrameBuffer):
+        image = Image.__new__(Image)
+        image.__size, image.__image, image.__buffer, image.__shared = buffer.size, "", buffer, False
+        return image
 
     @property
-    def pixels(self):
-        return self.__pixels
+    def shared(self) -> bool:
+        return self.__shared
 
     @property
     def width(self) -> int:
@@ -42,133 +80,151 @@ class Image:
 
     def fill(self, color: tuple[int, int, int] | list[int, int, int] | str | None):
         c = color if not isinstance(color, str) else COLORS[color]
-        for x in range(self.__size[0]):
-            for y in range(self.__size[1]):
-                if c is None and (x, y) in self.__pixels:
-                    del self.__pixels[(x, y)]
-                elif c is not None:
-                    self.__pixels[(x, y)] = (color[0], color[1], color[2])
-
-    def blit(self, image: Self, dest: tuple[int, int] | list[int, int]) -> None:
-        for pos, pix in image.pixels.items():
-            if 0 <= pos[0] <= image.width and 0 <= pos[1] <= image.height and pix is not None:
-                self.__pixels[(pos[0] + dest[0], pos[1] + dest[1])] = pix
-        # for i in range(image.width):
-        #     for j in range(image.height):
-        #         pixel = image.get_pixel((i, j))
-        #         if pixel is None:
-        #             continue
-        #         self.__pixels[(i+dest[0], j+dest[1])] = pixel
+        self.__own().fill(c)
+
+    def blit(self, image: Self, dest: tuple[int, int] | list[int, int] | Rect,
+             area: Rect | tuple[int, int, int, int] | None = None, clip: Rect | tuple[int, int, int, int] | None = None,
+             blend: str | None = None) -> None:
+        if isinstance(dest, Rect):
+            dest = dest.topleft
+        buffer, dest, area = image.source(dest, area)
+        self.__own().blit(buffer, dest, area, blend, clip)
+
+    def hline(self, color: tuple[int, int, int] | list[int, int, int] | str | None, x0: int, x1: int, y: int) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__own().hline(x0, x1, y, c)
+
+    def vline(self, color: tuple[int, int, int] | list[int, int, int] | str | None, x: int, y0: int, y1: int) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__own().vline(x, y0, y1, c)
+
+    def fill_rect(self, color: tuple[int, int, int] | list[int, int, int] | str | None, rect: Rect | tuple[int, int, int, int]) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__own().fill(c, as_area(rect))
+
+    def fill_spans(self, color: tuple[int, int, int] | list[int, int, int] | str | None, spans) -> None:
+        # spans is an iterable of (x0, x1, y) with inclusive ends.
+        c = color if not isinstance(color, str) else COLORS[color]
+        self.__own().spans(spans, c)
+
+    def source(self, dest: tuple[int, int] | list[int, int],
+               area: Rect | tuple[int, int, int, int] | None) -> tuple[FrameBuffer, tuple[int, int], Rect | tuple | None]:
+        # What blit reads from; atlas regions answer with their backing image.
+        return self.__buffer, dest, area
 
     def put_pixel(self, pos: tuple[int, int] | list[int, int],
-                  color: tuple[int, int, int] | list[int, int, int] | str | None) -> None:
+                  color: tuple[int, int, int] | tuple[int, int, int, int] | list[int] | str | None) -> None:
+        c = color if not isinstance(color, str) else COLORS[color]
+        (self.__own() if self.__shared else self.__buffer).put(pos, c)
+
+    def blend_pixel(self, pos: tuple[int, int] | list[int, int],
+                    color: tuple[int, int, int] | tuple[int, int, int, int] | list[int] | str,
+                    mode: str = keys.BLEND_OVER) -> None:
         c = color if not isinstance(color, str) else COLORS[color]
-        if c is None and pos in self.__pixels:
-            del self.__pixels[pos]
-        elif color is not None:
-            self.__pixels[pos] = (c[0], c[1], c[2])
+        self.__own().blend_pixel(pos, c, mode)
 
     def get_pixel(self, pos: tuple[int, int] | list[int, int]) -> tuple[int, int, int] | None:
-        return self.__pixels.get(pos, None)
+        return self.__buffer.get(pos)
+
+    def get_alpha(self, pos: tuple[int, int] | list[int, int]) -> int:
+        i = self.__buffer.index(pos)
+        return self.__buffer.mask[i] if i is not None else 0
+
+    @property
+    def encoder(self) -> Encoder:
+        # Shared by every Image so the escape caches stay warm across sprites.
+        if Image.__encoder is None:
+            import blessed
+            Image.__encoder = Encoder(blessed.Terminal())
+        return Image.__encoder
 
     def join(self, c):
-        if c[0] is None and c[1] is None:
-            return " "
-        elif c[0] is None:
-            return self.__terminal.color_rgb(*c[1]) + "▄" + '\033[0m'
-        elif c[1] is None:
-            return self.__terminal.color_rgb(*c[0]) + "▀" + '\033[0m'
-        else:
-            return self.__terminal.color_rgb(*c[0]) + self.__terminal.on_color_rgb(*c[1]) + "▀" + '\033[0m'
+        return self.encoder.encode([(pack(c[0]) if c[0] is not None else None, pack(c[1]) if c[1] is not None else None)]).decode()
 
     def __to_string(self) -> None:
-        scr: list[list[tuple | None]] = [
+        self.__image = b"\n".join(
             [
-                None for _ in range(self.__size[0] + 1)
-            ].copy() for __ in range(self.__size[1] + 1)
-        ]
-        self.__image = ""
-        for pos, pix in self.__pixels.items():
-            if 0 <= pos[0] <= self.__size[0] and 0 <= pos[1] <= self.__size[1]:
-                scr[pos[1]][pos[0]] = pix
-
-        self.__image = "\n".join(
-            [
-                "".join(
-                    [
-                        self.join([j, scr[i + 1][i2]]) for i2, j in enumerate(scr[i])
-                    ]
-                ) for i in range(0, len(scr) - 1, 2)
+                self.encoder.encode(cells(row)) for row in split_rows(self.__buffer, {}, self.width, self.height)
             ]
-        )
-        # for y in range(self.__size[1], 2):
-        #     for x in range(self.__size[0]):
-        #         if (x, y) in self.__pixels:
-        #             r1, g1, b1 = self.__pixels[(x, y)]
-        #         else:
-        #             r1, g1, b1 = None, None, None
-        #         if (x, y + 1) in self.__pixels:
-        #             r2, g2, b2 = self.__pixels[(x, y + 1)]
-        #         else:
-        #             r2, g2, b2 = None, None, None
-        #         if r1 is not None and r2 is not None:
-        #             self.__image += self.__terminal.color_rgb(r1, g1, b1) + self.__terminal.on_color_rgb(r2, g2, b2) + "▀"
-        #         elif r1 is not None:
-        #             self.__image += self.__terminal.color_rgb(*self.__pixels[(x, y)]) + "▀"
-        #         elif r2 is not None:
-        #             self.__image += self.__terminal.color_rgb(*self.__pixels[(x, y + 1)]) + "▄"
-        #         else:
-        #             self.__image += " "
-        #
-        #         self.__image += '\033[0m'
-        #     self.__image += "\n"
-        # if self.__size[1] % 2 != 0:
-        #     y = self.__size[1]
-        #     for x in range(self.__size[0]):
-        #         if (x, y) in self.__pixels:
-        #             r1, g1, b1 = self.__pixels[(x, y)]
-        #         else:
-        #             r1, g1, b1 = None, None, None
-        #         if r1 is not None:
-        #             self.__image += self.__terminal.color_rgb(*self.__pixels[(x, y)]) + "▀"
-        #         else:
-        #             self.__image += " "
-        #
-        #         self.__image += '\033[0m'
-        #     self.__image += "\n"
+        ).decode()
+
+    def set_canvas_size(self, size: tuple[int, int] | list[int, int]) -> None:
+        # Grows or crops in place, keeping the pixels both sizes have in common.
+        self.__buffer = self.__buffer.resized((size[0], size[1]))
+        self.__size, self.__image, self.__shared = self.__buffer.size, "", False
 
     def cropped(self, rect: Rect) -> Self:
         image = Image((rect.width, rect.height))
-        image.blit(self, (-rect.x, -rect.y))
+        image.blit(self, (0, 0), rect)
         return image
 
     @staticmethod
-    def open(filename: os.PathLike | str):
+    def open(filename: os.PathLike | str, cache: bool = True):
+        # Paths go through the shared asset cache; pass cache=False to always decode.
+        if cache and isinstance(filename, (str, os.PathLike)):
+            from pyterm.assets import cache as assets
+            return assets.open(filename)
+        if isinstance(filename, (str, os.PathLike)) and os.fspath(filename).endswith(RAW_EXTENSION):
+            return Image.load_raw(filename)
         from PIL import Image as PILImage
-        image = PILImage.open(filename)
-        if image.mode != "RGBA":
-            image = image.convert("RGBA")
-        new_image = Image(image.size)
-        for x in range(image.width):
-            for y in range(image.height):
-                pixel = image.getpixel((x, y))
-                if pixel[3] > 0:
-                    new_image.put_pixel((x, y), pixel[:-1])
-        return new_image
+        with PILImage.open(filename) as image:
+            return Image.fromPIL(image)
 
     @staticmethod
     def fromPIL(pil_image: PImage.Image):
-        image = pil_image.copy()
-        if image.mode != "RGBA":
-            image = image.convert("RGBA")
+        image = pil_image if pil_image.mode == "RGBA" else pil_image.convert("RGBA")
         new_image = Image(image.size)
-        for x in range(image.width):
-            for y in range(image.height):
-                pixel = image.getpixel((x, y))
-                if pixel[3] > 0:
-                    new_image.put_pixel((x, y), pixel[:-1])
+        new_image.buffer.load_rgba(image.tobytes())
         return new_image
 
+    def save_raw(self, filename: os.PathLike | str) -> None:
+        data = self.__buffer.data
+        if sys.byteorder != "little":
+            data = array('I', data)
+            data.byteswap()
+        # Written next to the target and renamed over it, so images mapped from
+        # the old file keep their inode instead of seeing it truncated.
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+        try:
+            with open(fd, "wb") as file:
+                file.write(RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, 0, self.width, self.height))
+                file.write(data.tobytes())
+                file.write(self.__buffer.mask)
+            os.chmod(temp, os.stat(filename).st_mode & 0o777 if os.path.exists(filename) else 0o644)
+            os.replace(temp, filename)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    @staticmethod
+    def load_raw(filename: os.PathLike | str):
+        # The file is mapped copy-on-write and used as the pixel storage as is;
+        # pages are read in on first use and writes never reach the file.
+        with open(filename, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        if mapped.size() < RAW_HEADER.size:
+            raise ValueError(f"Not a pyterm raw image: {filename}")
+        magic, version, _, width, height = RAW_HEADER.unpack_from(mapped)
+        if magic != RAW_MAGIC or version != RAW_VERSION:
+            raise ValueError(f"Not a pyterm raw image: {filename}")
+        n, start = width * height, RAW_HEADER.size
+        if mapped.size() < start + 5 * n:
+            raise ValueError(f"Truncated pyterm raw image: {filename}")
+        view = memoryview(mapped)
+        data = view[start:start + 4 * n].cast('I')
+        if sys.byteorder != "little":
+            data = array('I', data)
+            data.byteswap()
+        return Image.__wrap(FrameBuffer((width, height), data, view[start + 4 * n:start + 5 * n]))
+
+    def toPIL(self) -> PImage.Image:
+        raw = self.__buffer.data.tobytes()
+        r, g, b = (2, 1, 0) if sys.byteorder == "little" else (1, 2, 3)
+        rgba = bytearray(4 * len(self.__buffer.mask))
+        rgba[0::4], rgba[1::4], rgba[2::4] = raw[r::4], raw[g::4], raw[b::4]
+        rgba[3::4] = self.__buffer.mask
+        return PImage.frombytes("RGBA", self.__size, bytes(rgba))
+
     def to_rect(self, **keys):
         for key, value in keys.items():
             r = Rect(0, 0, self.width, self.height)
@@ -1 +1,3 @@
-from pyterm.__events import get_pressed
+def get_pressed():
+    import pyterm.__events as events
+    return events.get_pressed()
@@ -2,6 +2,17 @@ FULLSCREEN = 0
 FULLHEIGHT = 1
 FULLWIDTH = 2
 
+TRUECOLOR = "truecolor"
+COLOR256 = "256"
+COLOR16 = "16"
+
+BLEND_OVER = "over"
+BLEND_ADD = "add"
+BLEND_MULTIPLY = "multiply"
+
+EVEN_ODD = "evenodd"
+NONZERO = "nonzero"
+
 KEYDOWN = "KEYDOWN"
 KEYUP = "KEYUP"
 
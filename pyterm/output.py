@@ -0,0 +1,63 @@
+import os
+
+SYNC_BEGIN = b"\033[?2026h"
+SYNC_END = b"\033[?2026l"
+
+
+class FrameWriter:
+    def __init__(self, fd: int, sync: bool = False, capacity: int = 1 << 16):
+        self.__fd = fd
+        self.__sync = sync
+        self.__buffer = bytearray(capacity)
+        self.__length = 0
+        self.__frames = 0
+        self.__bytes_written = 0
+        self.__last_frame_bytes = 0
+
+    def begin(self) -> None:
+        self.__length = 0
+        if self.__sync:
+            self.extend(SYNC_BEGIN)
+
+    def extend(self, data: bytes) -> None:
+        # Writes into the preallocated buffer with same-length slice
+        # assignments, growing it only when a frame is larger than any before.
+        end = self.__length + len(data)
+        if end > len(self.__buffer):
+            self.__buffer.extend(bytes(max(end - len(self.__buffer), len(self.__buffer))))
+        self.__buffer[self.__length:end] = data
+        self.__length = end
+
+    def end(self) -> int:
+        if self.__length == len(SYNC_BEGIN) * self.__sync:
+            self.__last_frame_bytes = 0
+            return 0
+        if self.__sync:
+            self.extend(SYNC_END)
+        with memoryview(self.__buffer) as view:
+            self.write(view[:self.__length])
+        self.__frames += 1
+        self.__last_frame_bytes = self.__length
+        self.__bytes_written += self.__length
+        return self.__length
+
+    def write(self, data: bytes | memoryview) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.__fd, view):]
+
+    @property
+    def sync(self) -> bool:
+        return self.__sync
+
+    @property
+    def frames(self) -> int:
+        return self.__frames
+
+    @property
+    def bytes_written(self) -> int:
+        return self.__bytes_written
+
+    @property
+    def last_frame_bytes(self) -> int:
+        return self.__last_frame_bytes
@@ -0,0 +1,123 @@
+from array import array
+from pyterm.framebuffer import pack, unpack
+import pyterm.keys as keys
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ANSI16: list[tuple[int, int, int]] = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)
+]
+CUBE_LEVELS: tuple[int, ...] = (0, 95, 135, 175, 215, 255)
+BAYER: tuple[tuple[int, ...], ...] = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5)
+)
+
+
+def bucket(color: int) -> int:
+    # 15-bit index into the 32x32x32 lookup cube.
+    return (color >> 9 & 0x7C00) | (color >> 6 & 0x3E0) | (color >> 3 & 0x1F)
+
+
+def distance(a: tuple[int, int, int], b: tuple[int, int, int]) -> int:
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+def cube_level(value: int) -> int:
+    return 0 if value < 48 else 1 if value < 115 else (value - 35) // 40
+
+
+def nearest256(color: tuple[int, int, int]) -> int:
+    # Closest entry among the 6x6x6 cube and the 24-step gray ramp; the first
+    # 16 entries are left out because terminals theme them freely.
+    r, g, b = (cube_level(c) for c in color)
+    cube = (CUBE_LEVELS[r], CUBE_LEVELS[g], CUBE_LEVELS[b])
+    gray = min(23, max(0, (sum(color) // 3 - 3) // 10))
+    level = 8 + gray * 10
+    if distance(color, (level, level, level)) < distance(color, cube):
+        return 232 + gray
+    return 16 + 36 * r + 6 * g + b
+
+
+def nearest16(color: tuple[int, int, int]) -> int:
+    return min(range(16), key=lambda i: distance(color, ANSI16[i]))
+
+
+def xterm256() -> list[tuple[int, int, int]]:
+    colors = list(ANSI16)
+    colors += [(CUBE_LEVELS[i // 36], CUBE_LEVELS[i // 6 % 6], CUBE_LEVELS[i % 6]) for i in range(216)]
+    colors += [(8 + i * 10,) * 3 for i in range(24)]
+    return colors
+
+
+class Palette:
+    def __init__(self, mode: str):
+        match mode:
+            case keys.COLOR256:
+                self.__colors = xterm256()
+                nearest = nearest256
+                self.__spread = 40
+            case keys.COLOR16:
+                self.__colors = ANSI16
+                nearest = nearest16
+                self.__spread = 96
+            case _:
+                raise ValueError(f"Invalid color mode: {mode}")
+        self.__mode = mode
+        self.__lut = bytes(nearest(((i >> 10) << 3 | 4, (i >> 5 & 31) << 3 | 4, (i & 31) << 3 | 4)) for i in range(32768))
+        self.__np_lut = np.frombuffer(self.__lut, dtype=np.uint8).astype(np.uint32) if np is not None else None
+        self.__offsets = [
+            [int(((BAYER[y][x] + 0.5) / 16 - 0.5) * self.__spread) for x in range(4)] for y in range(4)
+        ]
+
+    @property
+    def mode(self) -> str:
+        return self.__mode
+
+    def fg(self, index: int) -> str:
+        if self.__mode == keys.COLOR256:
+            return f"\033[38;5;{index}m"
+        return f"\033[{30 + index}m" if index < 8 else f"\033[{82 + index}m"
+
+    def bg(self, index: int) -> str:
+        if self.__mode == keys.COLOR256:
+            return f"\033[48;5;{index}m"
+        return f"\033[{40 + index}m" if index < 8 else f"\033[{92 + index}m"
+
+    def nearest(self, color: int) -> int:
+        return self.__lut[bucket(color)]
+
+    def blend(self, a: int, b: int) -> int:
+        ca, cb = self.__colors[a], self.__colors[b]
+        return self.nearest(pack(((ca[0] + cb[0]) // 2, (ca[1] + cb[1]) // 2, (ca[2] + cb[2]) // 2)))
+
+    def quantize(self, data: array, width: int, dither: bool = False) -> array:
+        # Maps a whole frame of packed colors to palette indices in one pass.
+        if np is not None:
+            return self.__quantize_np(data, width, dither)
+        lut = self.__lut
+        if not dither:
+            return array('I', [lut[(v >> 9 & 0x7C00) | (v >> 6 & 0x3E0) | (v >> 3 & 0x1F)] for v in data])
+        out = array('I', bytes(4 * len(data)))
+        for i, v in enumerate(data):
+            o = self.__offsets[i // width & 3][i % width & 3]
+            r, g, b = (min(255, max(0, c + o)) for c in unpack(v))
+            out[i] = lut[(r >> 3) << 10 | (g >> 3) << 5 | b >> 3]
+        return out
+
+    def __quantize_np(self, data: array, width: int, dither: bool) -> array:
+        pixels = np.frombuffer(data, dtype=np.uint32)
+        if not dither or not len(pixels):
+            return array('I', self.__np_lut[(pixels >> 9 & 0x7C00) | (pixels >> 6 & 0x3E0) | (pixels >> 3 & 0x1F)].tobytes())
+        height = len(pixels) // width
+        rgb = np.stack(((pixels >> 16) & 255, (pixels >> 8) & 255, pixels & 255)).astype(np.int16).reshape(3, height, width)
+        offsets = np.tile(np.array(self.__offsets, dtype=np.int16), ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+        r, g, b = (np.clip(channel + offsets, 0, 255).astype(np.uint32) >> 3 for channel in rgb)
+        return array('I', self.__np_lut[(r << 10 | g << 5 | b).ravel()].tobytes())
@@ -0,0 +1,88 @@
+from typing import Callable
+
+symb = {
+    "\t": "tab",
+    "\n": "return",
+    "\r": "backspace",
+    " ": "space",
+    "`": "backtick",
+    "~": "tilde",
+    "!": "exclamation",
+    "@": "at sign",
+    "#": "hashtag",
+    "$": "dollar sign",
+    "%": "percent sign",
+    "^": "exponent",
+    "&": "and",
+    "*": "asterisk",
+    "(": "open round bracket",
+    ")": "close round bracket",
+    "-": "minus",
+    "_": "underscore",
+    "=": "equals",
+    "+": "plus",
+    "[": "open square bracket",
+    "]": "close square bracket",
+    "{": "open brace",
+    "}": "close brace",
+    "\\": "backslash",
+    "/": "slash",
+    "|": "vertical pipe",
+    ";": "semicolon",
+    ":": "colon",
+    "'": "single quote",
+    '"': "double quotes",
+    ",": "comma",
+    ".": "dot",
+    "<": "left angle bracket",
+    ">": "right angle bracket",
+    "?": "question mark"
+}
+
+ARROWS = {
+    b"[A": "KEY_UP",
+    b"[B": "KEY_DOWN",
+    b"[C": "KEY_RIGHT",
+    b"[D": "KEY_LEFT",
+    b"x7f": "KEY_BACKSPACE"
+}
+
+
+def to_name(button):
+    match button:
+        case 0:
+            return "LeftMouseDown"
+        case 3:
+            return "LeftMouseUp"
+        case 35:
+            return "MouseMove"
+        case 64:
+            return "ScrollDown"
+        case 65:
+            return "ScrollUp"
+        case 67:
+            return "ScrollRight"
+        case 66:
+            return "ScrollLeft"
+        case 32:
+            return "MouseMove"
+
+
+def parse(read: Callable[[int], bytes]) -> dict | None:
+    data = read(1)
+    if data == b"\033":
+        seq = read(2)
+        if seq == b"[M":
+            event = read(3)
+            button = event[0] - 32
+            col = event[2] - 32 - 1
+            row = event[1] - 32 - 1
+            return {"values": (to_name(button), (row, col*2)), "type": "MOUSE"}
+        if seq in ARROWS:
+            return {"values": (ARROWS[seq], "KEYDOWN"), "type": "KEY"}
+        return None
+    if decoded := data.decode("utf-8"):
+        if decoded in symb:
+            decoded = symb[decoded].upper()
+        return {"values": ("KEY_" + decoded, "KEYDOWN"), "type": "KEY"}
+    return None
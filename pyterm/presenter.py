@@ -0,0 +1,99 @@
+from typing import Callable
+from pyterm.framebuffer import FrameBuffer
+import threading
+import time
+
+
+class Presenter:
+    def __init__(self, render: Callable[..., object], write: Callable[[object], None]):
+        self.__render = render
+        self.__write = write
+        self.__condition = threading.Condition()
+        self.__pending: tuple | None = None
+        self.__spare: list[FrameBuffer] = []
+        self.__closed: bool = False
+        self.__presented: int = 0
+        self.__dropped: int = 0
+        self.__encode_time: float = 0.0
+        self.__write_time: float = 0.0
+        self.__error: BaseException | None = None
+        self.__reported: bool = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def acquire(self, size: tuple[int, int]) -> FrameBuffer:
+        # Buffers go back and forth between the game thread and the writer, so
+        # a steady game loop reuses the same couple of framebuffers.
+        with self.__condition:
+            while self.__spare:
+                buffer = self.__spare.pop()
+                if buffer.size == size:
+                    return buffer
+        return FrameBuffer(size)
+
+    def __raise(self) -> None:
+        # A failure on the writer thread surfaces on the game thread, from
+        # every later submit() and from close() if nothing has raised it yet.
+        if self.__error is not None:
+            self.__reported = True
+            raise self.__error
+
+    def submit(self, buffer: FrameBuffer, *args) -> None:
+        with self.__condition:
+            self.__raise()
+            if self.__closed:
+                return
+            if self.__pending is not None:
+                self.__dropped += 1
+                self.__spare.append(self.__pending[0])
+            self.__pending = (buffer, *args)
+            self.__condition.notify()
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__pending is None and not self.__closed:
+                    self.__condition.wait()
+                if self.__pending is None:
+                    return
+                frame, self.__pending = self.__pending, None
+            start = time.perf_counter()
+            try:
+                screen = self.__render(*frame)
+                encoded = time.perf_counter()
+                self.__write(screen)
+            except Exception as error:
+                with self.__condition:
+                    self.__error = error
+                    self.__closed = True
+                return
+            written = time.perf_counter()
+            with self.__condition:
+                self.__spare.append(frame[0])
+                self.__presented += 1
+                self.__encode_time = encoded - start
+                self.__write_time = written - encoded
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify()
+        self.__thread.join()
+        if not self.__reported:
+            self.__raise()
+
+    @property
+    def presented(self) -> int:
+        return self.__presented
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    @property
+    def encode_time(self) -> float:
+        return self.__encode_time
+
+    @property
+    def write_time(self) -> float:
+        return self.__write_time
@@ -0,0 +1,96 @@
+from typing import Callable
+from array import array
+from pyterm.framebuffer import FrameBuffer
+from pyterm.output import FrameWriter
+import threading
+
+
+CLEAR = b"\033[H\033[2J"
+
+
+def move(x: int, y: int) -> bytes:
+    return b"\033[%d;%dH" % (y + 1, x + 1)
+
+
+def split_rows(buffer: FrameBuffer, text: dict[tuple[int, int], str], width: int, height: int,
+               data: array | None = None) -> list[tuple]:
+    data = buffer.data if data is None else data
+    lines: dict[int, dict[int, str]] = {}
+    for (x, y), ch in text.items():
+        if 0 <= x < width:
+            lines.setdefault(y, {})[x] = ch
+    rows = []
+    stride, mask = buffer.width, buffer.mask
+    height, width = min(height, buffer.height), min(width, stride)
+    for y in range(0, height, 2):
+        s = y * stride
+        if y + 1 < buffer.height:
+            b = s + stride
+            bottom, bottom_mask = data[b:b + width], mask[b:b + width]
+        else:
+            bottom, bottom_mask = array('I', bytes(4 * width)), bytearray(width)
+        rows.append((data[s:s + width], mask[s:s + width], bottom, bottom_mask, lines.get(y, {})))
+    return rows
+
+
+def cells(row: tuple) -> list[tuple]:
+    top, top_mask, bottom, bottom_mask, text = row
+    return [
+        (top[x] if top_mask[x] else None, bottom[x] if bottom_mask[x] else None, text.get(x))
+        for x in range(len(top))
+    ]
+
+
+class Renderer:
+    def __init__(self, encode: Callable[[list[tuple]], bytes], quantize: Callable[[FrameBuffer], array] | None = None):
+        self.__encode = encode
+        self.__quantize = quantize
+        self.__last: list[tuple] | None = None
+        self.__changed: int = 0
+        self.__redraw: int = 0
+        self.__redraw_lock = threading.Lock()
+
+    @property
+    def changed(self) -> int:
+        return self.__changed
+
+    def force_full_redraw(self, clear: bool = False) -> None:
+        # Picked up by the next render, which may run on the presenter thread,
+        # so the flag is only read and reset under the lock.
+        with self.__redraw_lock:
+            self.__redraw = max(self.__redraw, 2 if clear else 1)
+
+    def render(self, buffer: FrameBuffer, text: dict[tuple[int, int], str], width: int, height: int,
+               out: FrameWriter) -> None:
+        data = self.__quantize(buffer) if self.__quantize is not None else None
+        rows = split_rows(buffer, text, width, height, data)
+        with self.__redraw_lock:
+            redraw, self.__redraw = self.__redraw, 0
+        last = self.__last if not redraw else None
+        if redraw == 2:
+            out.extend(CLEAR)
+        if last is not None and (len(last) != len(rows) or any(len(a[0]) != len(b[0]) for a, b in zip(last, rows))):
+            last = None
+        changed = 0
+        for y, row in enumerate(rows):
+            if last is None:
+                changed += len(row[0])
+                out.extend(move(0, y))
+                out.extend(self.__encode(cells(row)))
+                continue
+            if last[y] == row:
+                continue
+            current, previous = cells(row), cells(last[y])
+            x, width = 0, len(current)
+            while x < width:
+                if current[x] == previous[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < width and current[x] != previous[x]:
+                    x += 1
+                changed += x - start
+                out.extend(move(start, y))
+                out.extend(self.__encode(current[start:x]))
+        self.__last = rows
+        self.__changed = changed
@@ -0,0 +1,77 @@
+from collections import deque
+from typing import Callable, TextIO
+import json
+
+FIELDS: tuple[str, ...] = ("frame", "idle", "compose", "encode", "write", "bytes", "cells", "pixels", "events")
+
+
+class FrameStats:
+    def __init__(self, window: int = 120):
+        self.__samples: deque[dict] = deque(maxlen=window)
+        self.__exporters: list[Callable[[dict], None]] = []
+        self.__files: list[TextIO] = []
+        self.__frames: int = 0
+
+    def record(self, sample: dict) -> None:
+        self.__frames += 1
+        sample["index"] = self.__frames
+        self.__samples.append(sample)
+        for exporter in self.__exporters:
+            exporter(sample)
+
+    def values(self, field: str) -> list:
+        return [sample[field] for sample in list(self.__samples) if field in sample]
+
+    def average(self, field: str) -> float:
+        values = self.values(field)
+        return sum(values) / len(values) if values else 0.0
+
+    def percentile(self, field: str, q: float) -> float:
+        values = sorted(self.values(field))
+        return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+    @property
+    def fps(self) -> float:
+        frame = self.average("frame")
+        return 1 / frame if frame else 0.0
+
+    @property
+    def frames(self) -> int:
+        return self.__frames
+
+    @property
+    def last(self) -> dict | None:
+        return self.__samples[-1] if self.__samples else None
+
+    def summary(self) -> dict:
+        return {"frames": self.__frames, "fps": self.fps, **{field: self.average(field) for field in FIELDS}}
+
+    def add_exporter(self, exporter: Callable[[dict], None]) -> None:
+        self.__exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Callable[[dict], None]) -> None:
+        self.__exporters.remove(exporter)
+
+    def export(self, path: str) -> Callable[[dict], None]:
+        # Streams every sample as one JSON line; close() flushes the file.
+        file = open(path, "a")
+        self.__files.append(file)
+
+        def exporter(sample: dict) -> None:
+            file.write(json.dumps(sample) + "\n")
+        self.add_exporter(exporter)
+        return exporter
+
+    def close(self) -> None:
+        self.__exporters.clear()
+        for file in self.__files:
+            file.close()
+        self.__files.clear()
+
+    def overlay(self) -> list[str]:
+        return [
+            f" fps {self.fps:5.1f}  compose {self.average('compose') * 1000:6.2f}ms"
+            f"  encode {self.average('encode') * 1000:6.2f}ms  write {self.average('write') * 1000:6.2f}ms ",
+            f" bytes {self.average('bytes'):8.0f}  cells {self.average('cells'):6.0f}"
+            f"  pixels {self.average('pixels'):7.0f}  events {self.average('events'):3.0f} "
+        ]
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from functools import lru_cache
+from pyterm.image import Image
+from PIL import Image as PImage, ImageDraw, ImageFont
+
+
+@lru_cache(maxsize=32)
+def load_font(font: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font, size)
+
+
+def rasterize(text: str, color, imfont: ImageFont.FreeTypeFont, width: int, size: int) -> Image:
+    img = PImage.new('RGBA', (max(1, width), size), (255, 255, 255, 0))
+    im = ImageDraw.Draw(img)
+    im.text((0, 0), text, font=imfont, fill=color)
+    return Image.fromPIL(img)
+
+
+def composable(text: str, imfont: ImageFont.FreeTypeFont) -> bool:
+    # Blitting cached glyphs matches a whole-string render only when every pen
+    # position is a whole pixel, no pair is kerned and no glyph reaches
+    # outside its own advance. Digits in most fonts qualify, which covers HUD
+    # counters.
+    pen = 0.0
+    for i, ch in enumerate(text):
+        advance = imfont.getlength(ch)
+        if advance != int(advance):
+            return False
+        if not ch.isspace():
+            left, _, right, _ = imfont.getbbox(ch)
+            if left < 0 or (right > advance and i < len(text) - 1):
+                return False
+        pen += advance
+    return pen == imfont.getlength(text)
+
+
+class TextCache:
+    def __init__(self, budget: int = 1 << 20):
+        # The budget is in pixels and is shared by whole strings and glyphs.
+        self.__budget = budget
+        self.__used = 0
+        self.__entries: OrderedDict[tuple, Image] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    def __get(self, key: tuple) -> Image | None:
+        image = self.__entries.get(key)
+        if image is not None:
+            self.__entries.move_to_end(key)
+        return image
+
+    def __put(self, key: tuple, image: Image) -> Image:
+        self.__entries[key] = image
+        self.__used += image.width * image.height
+        while self.__used > self.__budget and len(self.__entries) > 1:
+            _, old = self.__entries.popitem(last=False)
+            self.__used -= old.width * old.height
+        return image
+
+    def glyph(self, ch: str, color, font: str, size: int) -> Image:
+        key = ("glyph", font, size, ch, color)
+        image = self.__get(key)
+        if image is None:
+            imfont = load_font(font, size)
+            width = max(int(imfont.getlength(ch)), imfont.getbbox(ch)[2])
+            image = self.__put(key, rasterize(ch, color, imfont, width, size))
+        return image
+
+    def render(self, text: str, color, font: str, size: int) -> Image:
+        color = tuple(color) if isinstance(color, list) else color
+        key = ("text", font, size, text, color)
+        image = self.__get(key)
+        if image is not None:
+            self.__hits += 1
+            return image
+        self.__misses += 1
+        imfont = load_font(font, size)
+        width = int(imfont.getlength(text))
+        if not composable(text, imfont):
+            return self.__put(key, rasterize(text, color, imfont, width, size))
+        image = Image((width, size))
+        for i, ch in enumerate(text):
+            if not ch.isspace():
+                image.blit(self.glyph(ch, color, font, size), (int(imfont.getlength(text[:i])), 0))
+        return self.__put(key, image)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__used = 0
+
+    @property
+    def budget(self) -> int:
+        return self.__budget
+
+    @budget.setter
+    def budget(self, value: int) -> None:
+        self.__budget = value
+
+    @property
+    def used(self) -> int:
+        return self.__used
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+
+cache = TextCache()
@@ -58,14 +58,15 @@ def rotate(surface: Image, degree: int):
             elif min_y > new_y:
                 min_y = new_y
 
-    new_surface = Image((max_x + abs(min_x), max_y + abs(min_y)))
+    # Both ends are written, and int() never lands outside the round() range.
+    new_surface = Image((max_x - min_x + 1, max_y - min_y + 1))
 
     for x in range(surface.width):
         for y in range(surface.height):
             for f1 in [int, round]:
                 for f2 in [int, round]:
-                    new_x = f1(x * math.cos(radian) - y * math.sin(radian)) + abs(min_x)
-                    new_y = f2(x * math.sin(radian) + y * math.cos(radian)) + abs(min_y)
+                    new_x = f1(x * math.cos(radian) - y * math.sin(radian)) - min_x
+                    new_y = f2(x * math.sin(radian) + y * math.cos(radian)) - min_y
                     new_surface.put_pixel((new_x, new_y), surface.get_pixel((x, y)))
 
     return new_surface